@@ -0,0 +1,39 @@
+"""product pagination indexes
+
+Revision ID: 3b1f6c0d2e47
+Revises: aa2f86c30a98
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b1f6c0d2e47'
+down_revision: Union[str, None] = 'aa2f86c30a98'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_created_at_id', 'products', ['created_at', 'id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_products_brand_created_at_id', 'products', ['brand', 'created_at', 'id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_products_price', 'products', ['price'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_price', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_products_brand_created_at_id', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_products_created_at_id', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
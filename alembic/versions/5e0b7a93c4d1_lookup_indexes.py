@@ -0,0 +1,41 @@
+"""lookup indexes
+
+Revision ID: 5e0b7a93c4d1
+Revises: 7c2d9e41a8b3
+Create Date: 2026-10-18 14:05:22.731940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0b7a93c4d1'
+down_revision: Union[str, None] = '7c2d9e41a8b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# users.username needs nothing here: its unique constraint is backed by an index.
+INDEXES = (
+    ('ix_reviews_product_id', 'reviews', ['product_id']),
+    ('ix_reviews_review_maker_id', 'reviews', ['review_maker_id']),
+    ('ix_order_product_product_id', 'order_product', ['product_id']),
+    ('ix_token_revocations_revoked_at', 'token_revocations', ['revoked_at']),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block. If a
+    # concurrent build fails it leaves an INVALID index behind; drop it and
+    # rerun the upgrade.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
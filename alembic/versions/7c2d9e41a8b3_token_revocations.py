@@ -0,0 +1,36 @@
+"""token revocations
+
+Revision ID: 7c2d9e41a8b3
+Revises: 3b1f6c0d2e47
+Create Date: 2026-10-18 10:41:07.502316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e41a8b3'
+down_revision: Union[str, None] = '3b1f6c0d2e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Already there on databases created by create_all.
+    if 'token_revocations' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'token_revocations',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('jti', sa.String(), nullable=True),
+        sa.Column('user_id', sa.UUID(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('token_revocations')
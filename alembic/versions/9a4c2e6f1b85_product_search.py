@@ -0,0 +1,56 @@
+"""product search
+
+Revision ID: 9a4c2e6f1b85
+Revises: 5e0b7a93c4d1
+Create Date: 2026-10-18 15:27:49.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c2e6f1b85'
+down_revision: Union[str, None] = '5e0b7a93c4d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = "to_tsvector('simple'::regconfig, coalesce(name, '') || ' ' || coalesce(brand, ''))"
+
+SQLITE_UPGRADE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(name, brand, content='products', content_rowid='rowid')",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, brand) VALUES (new.rowid, new.name, new.brand);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand) VALUES ('delete', old.rowid, old.name, old.brand);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, brand ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, brand) VALUES ('delete', old.rowid, old.name, old.brand);
+        INSERT INTO products_fts(rowid, name, brand) VALUES (new.rowid, new.name, new.brand);
+    END""",
+    # Index the rows that are already there
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+        return
+    # The GIN index keeps itself up to date; search.py queries this same expression.
+    with op.get_context().autocommit_block():
+        op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_search ON products USING gin ({SEARCH_VECTOR})")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('products_fts_au', 'products_fts_ad', 'products_fts_ai'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS products_fts")
+        return
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_products_search")
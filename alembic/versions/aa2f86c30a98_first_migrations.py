@@ -19,8 +19,71 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    pass
+    # Databases created by the old create_all-at-import already have these
+    # tables; only the missing ones are created, so they can upgrade in place.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.UUID(), primary_key=True),
+            sa.Column('username', sa.String(), unique=True),
+            sa.Column('email', sa.String(), unique=True),
+            sa.Column('hashed_password', sa.String()),
+            sa.Column('first_name', sa.String()),
+            sa.Column('last_name', sa.String()),
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+
+    if 'products' not in existing:
+        op.create_table(
+            'products',
+            sa.Column('id', sa.UUID(), primary_key=True),
+            sa.Column('name', sa.String(), unique=True),
+            sa.Column('price', sa.Numeric(precision=10, scale=2)),
+            sa.Column('brand', sa.String()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+        op.create_index('ix_products_id', 'products', ['id'])
+
+    if 'orders' not in existing:
+        op.create_table(
+            'orders',
+            sa.Column('id', sa.UUID(), primary_key=True),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+            sa.Column('owner_id', sa.UUID(), sa.ForeignKey('users.id')),
+            sa.Column('shipping_address', sa.String()),
+            sa.Column('payment_method', sa.Enum('STRIPE', 'CARD', name='paymentmethodenum')),
+        )
+        op.create_index('ix_orders_id', 'orders', ['id'])
+        op.create_index('ix_orders_owner_id', 'orders', ['owner_id'])
+
+    if 'order_product' not in existing:
+        op.create_table(
+            'order_product',
+            sa.Column('order_id', sa.UUID(), sa.ForeignKey('orders.id'), primary_key=True, nullable=False),
+            sa.Column('product_id', sa.UUID(), sa.ForeignKey('products.id'), primary_key=True, nullable=False),
+        )
+
+    if 'reviews' not in existing:
+        op.create_table(
+            'reviews',
+            sa.Column('id', sa.UUID(), primary_key=True),
+            sa.Column('product_id', sa.UUID(), sa.ForeignKey('products.id')),
+            sa.Column('review_content', sa.String()),
+            sa.Column('review_maker_id', sa.UUID(), sa.ForeignKey('users.id')),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime()),
+        )
+        op.create_index('ix_reviews_id', 'reviews', ['id'])
 
 
 def downgrade() -> None:
-    pass
+    op.drop_table('reviews')
+    op.drop_table('order_product')
+    op.drop_table('orders')
+    op.drop_table('products')
+    op.drop_table('users')
+    sa.Enum(name='paymentmethodenum').drop(op.get_bind(), checkfirst=True)
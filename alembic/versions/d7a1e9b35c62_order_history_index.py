@@ -0,0 +1,36 @@
+"""order history index
+
+Revision ID: d7a1e9b35c62
+Revises: c3f8a6d20e14
+Create Date: 2026-10-18 18:02:36.914507
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1e9b35c62'
+down_revision: Union[str, None] = 'c3f8a6d20e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset pagination of GET /users/me/orders; replaces ix_orders_owner_id,
+    # a prefix of it.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_owner_id_created_at_id', 'orders', ['owner_id', 'created_at', 'id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_orders_owner_id', table_name='orders',
+                      postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_orders_owner_id', 'orders', ['owner_id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_orders_owner_id_created_at_id', table_name='orders',
+                      postgresql_concurrently=True, if_exists=True)
@@ -1,5 +0,0 @@
-from enum import Enum
-
-class PaymentMethodEnum(str, Enum):
-    STRIPE = "stripe"
-    CARD = "card"
\ No newline at end of file
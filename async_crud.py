@@ -0,0 +1,347 @@
+import logging
+from decimal import Decimal
+from sqlalchemy import delete, insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+import models
+import schemas
+import revocation
+import cache
+import autocomplete
+import coalescing
+from async_db import in_own_async_session
+import search
+import bulk_import
+import uuid
+from typing import List, Optional
+from crud import (
+    PRODUCT_IMPORT_COLUMNS, PRODUCT_IMPORT_STAGING, PRODUCT_STAGING_DDL, PRODUCT_VERSION_COLUMNS,
+    UnknownProductsError, apply_bulk_change, apply_import, bulk_batch_update, bulk_page_statement, bulk_selection_statement,
+    bulk_update_values, existing_products_statement, import_rows, new_order_row, order_detail_statement,
+    order_view, product_reviews_statement, product_upsert_statement, products_on_orders,
+    products_page_statement, review_stats_statement, split_order_page, split_page, user_orders_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+# Async counterparts of the functions in crud.py, for endpoints running on the
+# event loop. They share statements and helpers with crud so the two stay in step.
+
+# User CRUD functions
+
+async def get_user(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
+async def delete_user_by_id(db: AsyncSession, user_id: uuid.UUID):
+    user = await db.get(models.User, user_id)
+    if user:
+        await db.delete(user)
+        revocation.revoke(db, user_id=user.id)
+        await db.commit()
+        return True
+    return False
+
+async def update_user(db: AsyncSession, username: str, user_update: schemas.UserUpdate):
+    db_user = await get_user(db, username)
+    if db_user:
+        for attr, value in vars(user_update).items():
+            if value is not None:
+                setattr(db_user, attr, value)
+        # Tokens carry the user's claims, so the ones issued before this change are revoked
+        revocation.revoke(db, user_id=db_user.id)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+    return None
+
+# Product CRUD functions
+
+async def get_product(db: AsyncSession, id: uuid.UUID):
+    return await db.get(models.Product, id)
+
+async def load_product_snapshot(db: AsyncSession, id: uuid.UUID):
+    generation = cache.products.generation
+    product = await get_product(db, id=id)
+    if product is None:
+        return None
+    snapshot = cache.product_snapshot(product)
+    cache.products.put(id, snapshot, generation)
+    return snapshot
+
+async def get_product_cached(db: AsyncSession, id: uuid.UUID):
+    # Read-through: a snapshot dict from cache.products. Concurrent misses for
+    # the same id share one query, run on a session of its own.
+    snapshot = cache.products.get(id)
+    if snapshot is None:
+        snapshot = await coalescing.reads.do(
+            ("product", id, db.bind), lambda: in_own_async_session(db.bind, load_product_snapshot, id)
+        )
+    return snapshot
+
+async def get_products(
+    db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+):
+    statement = products_page_statement(limit, cursor, brand, price_min, price_max)
+    return split_page((await db.scalars(statement)).all(), limit)
+
+async def get_products_version(
+    db: AsyncSession,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+):
+    # Same page as get_products, but only (id, created_at, updated_at) per row
+    statement = products_page_statement(
+        limit, cursor, brand, price_min, price_max, columns=PRODUCT_VERSION_COLUMNS
+    )
+    return split_page((await db.execute(statement)).all(), limit)
+
+async def search_products(db: AsyncSession, q: str, limit: int = 50, cursor: Optional[str] = None):
+    terms = search.terms_of(q)
+    if not terms:
+        return [], None
+    statement = search.search_statement(db.bind.dialect.name, terms, limit, cursor)
+    return search.split_page((await db.execute(statement)).all(), limit)
+
+async def add_product(db: AsyncSession, product: schemas.ProductAdd):
+    db_product = models.Product(name=product.name, price=product.price, brand=product.brand)
+    db.add(db_product)
+    await db.commit()
+    await db.refresh(db_product)
+    cache.products.put(db_product.id, cache.product_snapshot(db_product))
+    autocomplete.products.add_product(db_product.name, db_product.brand)
+    return db_product
+
+async def delete_product(db: AsyncSession, id: uuid.UUID):
+    db_product = await db.get(models.Product, id)
+    if db_product:
+        name, brand = db_product.name, db_product.brand
+        await db.delete(db_product)
+        await db.commit()
+        cache.products.invalidate(id)
+        autocomplete.products.discard_product(name, brand)
+        return db_product
+
+async def upsert_products(db: AsyncSession, rows: List[dict]):
+    dialect = db.bind.dialect.name
+    if dialect != "postgresql":
+        # One executemany of INSERT ... ON CONFLICT (name) DO UPDATE
+        await db.execute(product_upsert_statement(dialect), rows)
+        return
+    # COPY the chunk into a temp table over asyncpg's binary protocol, then
+    # merge it with a single INSERT ... SELECT ... ON CONFLICT.
+    await db.execute(text(PRODUCT_STAGING_DDL))
+    connection = await (await db.connection()).get_raw_connection()
+    await connection.driver_connection.copy_records_to_table(
+        PRODUCT_IMPORT_STAGING,
+        columns=PRODUCT_IMPORT_COLUMNS,
+        records=[
+            (row["id"], row["name"], Decimal(str(row["price"])), row["brand"], row["created_at"], row["updated_at"])
+            for row in rows
+        ],
+    )
+    await db.execute(product_upsert_statement(dialect, from_staging=True))
+
+async def import_products(db: AsyncSession, chunks) -> dict:
+    # chunks: bulk_import.chunks() over the upload. Each chunk is its own
+    # transaction of three statements: the lookup of the names that already
+    # exist (for the counts and the caches), the load, and the commit.
+    result = {"inserted": 0, "updated": 0, "duplicates": 0, "failed": 0, "errors": []}
+
+    def report(errors):
+        result["failed"] += len(errors)
+        result["errors"].extend(errors[:max(bulk_import.IMPORT_MAX_ERRORS - len(result["errors"]), 0)])
+
+    async for chunk in chunks:
+        report(chunk.errors)
+        if not chunk.rows:
+            continue
+        rows = import_rows([product for _, product in chunk.rows])
+        try:
+            existing = (await db.execute(existing_products_statement([row["name"] for row in rows]))).all()
+            await upsert_products(db, rows)
+            await db.commit()
+        except DBAPIError:
+            await db.rollback()
+            logger.exception("Product import chunk rejected")
+            report([bulk_import.row_error(line, "rejected by the database with its chunk") for line, _ in chunk.rows])
+            continue
+        inserted = apply_import(rows, existing)
+        result["inserted"] += inserted
+        result["updated"] += len(rows) - inserted
+        # Rows of the chunk superseded by a later row with the same name
+        result["duplicates"] += len(chunk.rows) - len(rows)
+    return result
+
+BULK_COLUMNS = (models.Product.id, models.Product.name, models.Product.brand)
+
+async def bulk_update_products(db: AsyncSession, change: schemas.ProductBulkUpdate, batch_size: int = 1000) -> dict:
+    # Batches commit one by one. If the database rejects one, the batches
+    # before it stay committed and the result says so: count is what changed,
+    # complete is False.
+    values = bulk_update_values(change)
+    selection = bulk_selection_statement(change.filter)
+    updated, last = 0, None
+    try:
+        while True:
+            batch = (await db.scalars(bulk_page_statement(selection, last, batch_size))).all()
+            if not batch:
+                break
+            last = batch[-1]
+            old = ()
+            if change.brand is not None:
+                # The brands being replaced are read first, for the autocomplete
+                # index; FOR UPDATE holds the batch until the commit.
+                old = (await db.execute(
+                    bulk_selection_statement(change.filter, columns=BULK_COLUMNS)
+                    .where(models.Product.id.in_(batch)).with_for_update()
+                )).all()
+                batch = [row.id for row in old]
+            # UPDATE ... WHERE id IN (batch) AND <filter> RETURNING
+            rows = (await db.execute(
+                bulk_batch_update(change.filter, batch).values(**values).returning(*BULK_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await db.commit()
+            apply_bulk_change(
+                [row.id for row in rows],
+                added=[(row.name, row.brand) for row in rows] if old else (),
+                discarded=[(row.name, row.brand) for row in old],
+            )
+            updated += len(rows)
+    except DBAPIError:
+        await db.rollback()
+        logger.exception("Bulk product update stopped after %d products", updated)
+        return {"count": updated, "complete": False}
+    return {"count": updated, "complete": True}
+
+async def bulk_delete_products(db: AsyncSession, selection: schemas.ProductFilter, batch_size: int = 1000) -> dict:
+    # Committed batch by batch, and reported like bulk_update_products
+    statement = bulk_selection_statement(selection).where(~products_on_orders())
+    deleted, last = 0, None
+    try:
+        while True:
+            batch = (await db.scalars(bulk_page_statement(statement, last, batch_size))).all()
+            if not batch:
+                break
+            last = batch[-1]
+            batch = (await db.scalars(statement.where(models.Product.id.in_(batch)).with_for_update())).all()
+            # As with a single delete, the products' reviews stay, detached from them
+            await db.execute(
+                update(models.Review).where(models.Review.product_id.in_(batch)).values(product_id=None)
+                .execution_options(synchronize_session=False)
+            )
+            rows = (await db.execute(
+                delete(models.Product).where(models.Product.id.in_(batch)).returning(*BULK_COLUMNS)
+                .execution_options(synchronize_session=False)
+            )).all()
+            await db.commit()
+            apply_bulk_change([row.id for row in rows], discarded=[(row.name, row.brand) for row in rows])
+            deleted += len(rows)
+    except DBAPIError:
+        await db.rollback()
+        logger.exception("Bulk product delete stopped after %d products", deleted)
+        return {"count": deleted, "complete": False}
+    return {"count": deleted, "complete": True}
+
+# Order CRUD functions
+
+async def get_order(db: AsyncSession, order_id: uuid.UUID):
+    return await db.get(models.Order, order_id)
+
+async def set_order(db: AsyncSession, order_data: schemas.OrderCreate):
+    product_ids = list(dict.fromkeys(order_data.product_ids))
+    found = set(await db.scalars(select(models.Product.id).where(models.Product.id.in_(product_ids))))
+    unknown = [product_id for product_id in product_ids if product_id not in found]
+    if unknown:
+        raise UnknownProductsError(unknown)
+
+    order_row = new_order_row(order_data)
+    await db.execute(insert(models.Order).values(**order_row))
+    if product_ids:
+        await db.execute(
+            insert(models.OrderProduct),
+            [{"order_id": order_row["id"], "product_id": product_id} for product_id in product_ids],
+        )
+    await db.commit()
+    return models.Order(**order_row)
+
+async def get_order_detail(db: AsyncSession, order_id: uuid.UUID, owner_id: uuid.UUID):
+    row = (await db.execute(order_detail_statement(order_id, owner_id))).first()
+    return order_view(*row) if row is not None else None
+
+async def get_user_orders(db: AsyncSession, owner_id: uuid.UUID, limit: int = 50, cursor: Optional[str] = None):
+    return split_order_page((await db.execute(user_orders_statement(owner_id, limit, cursor))).all(), limit)
+
+async def delete_order(db: AsyncSession, order_id: uuid.UUID):
+    order = await db.get(models.Order, order_id)
+    if order:
+        await db.delete(order)
+        await db.commit()
+        return order
+    return None
+
+async def update_order(db: AsyncSession, order_id: uuid.UUID, order_update: schemas.OrderUpdate):
+    db_order = await db.get(models.Order, order_id)
+    if db_order:
+        for attr, value in vars(order_update).items():
+            if value is not None:
+                setattr(db_order, attr, value)
+        await db.commit()
+        await db.refresh(db_order)
+        return db_order
+    return None
+
+# Review CRUD
+
+async def create_review(db: AsyncSession, review: schemas.ReviewCreate, user_id: uuid.UUID):
+    db_review = models.Review(**review.dict(), review_maker_id=user_id)
+    db.add(db_review)
+    await db.flush()
+    await db.execute(review_stats_statement(review.product_id, 1))
+    await db.commit()
+    cache.products.invalidate(review.product_id)
+    await db.refresh(db_review)
+    return db_review
+
+async def get_product_reviews(db: AsyncSession, product_id: uuid.UUID, limit: int = 50, cursor: Optional[str] = None):
+    return split_page((await db.scalars(product_reviews_statement(product_id, limit, cursor))).all(), limit)
+
+async def get_review(db: AsyncSession, review_id: uuid.UUID):
+    return await db.get(models.Review, review_id)
+
+async def update_review(db: AsyncSession, review_id: uuid.UUID, review: schemas.ReviewUpdate):
+    db_review = await db.get(models.Review, review_id)
+    if db_review:
+        old_product_id = db_review.product_id
+        for key, value in review.dict().items():
+            setattr(db_review, key, value)
+        if db_review.product_id != old_product_id:
+            await db.flush()
+            for product_id, delta in ((old_product_id, -1), (db_review.product_id, 1)):
+                if product_id is not None:
+                    await db.execute(review_stats_statement(product_id, delta))
+        await db.commit()
+        cache.products.invalidate(old_product_id)
+        cache.products.invalidate(db_review.product_id)
+        await db.refresh(db_review)
+    return db_review
+
+async def delete_review(db: AsyncSession, review_id: uuid.UUID):
+    db_review = await db.get(models.Review, review_id)
+    if db_review:
+        product_id = db_review.product_id
+        await db.delete(db_review)
+        await db.flush()
+        if product_id is not None:
+            await db.execute(review_stats_statement(product_id, -1))
+        await db.commit()
+        cache.products.invalidate(product_id)
+    return db_review
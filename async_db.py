@@ -0,0 +1,71 @@
+import os
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import pool_metrics
+import slow_queries
+from db import DATABASE_URL, pool_options_for
+
+# Async drivers for the sync URLs we use: asyncpg for Postgres, aiosqlite for local tests.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+_async_engine = None
+
+def get_async_engine():
+    # Lazy like db.get_engine(). No lock: it is only called on the event loop,
+    # and nothing here awaits.
+    global _async_engine
+    if _async_engine is None:
+        url = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+        # asyncpg always talks UTF-8 to the server, so there is no client_encoding override here.
+        engine = create_async_engine(url, **pool_options_for(url, "primary_async", AsyncAdaptedQueuePool))
+        pool_metrics.listen(engine.sync_engine, "primary_async")
+        slow_queries.listen(engine, "primary_async")
+        _async_engine = engine
+    return _async_engine
+
+async def dispose_async_engine():
+    global _async_engine
+    engine, _async_engine = _async_engine, None
+    if engine is not None:
+        await engine.dispose()
+
+def _forget_async_engine_after_fork():
+    # As db._forget_engine_after_fork; the pool lives on the sync engine
+    global _async_engine
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+        _async_engine = None
+
+os.register_at_fork(after_in_child=_forget_async_engine_after_fork)
+
+def __getattr__(name):
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# expire_on_commit=False: response models read attributes after the commit,
+# and an expired attribute cannot be lazily reloaded outside the greenlet.
+_async_session_factory = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def AsyncSessionLocal(bind=None):
+    return _async_session_factory(bind=bind or get_async_engine())
+
+async def in_own_async_session(bind, fn, *args, **kwargs):
+    # As db.in_own_session. The shared task is shielded and keeps running when
+    # the request that started it times out or ends, and closes its session.
+    async with AsyncSessionLocal(bind=bind) as db:
+        return await fn(db, *args, **kwargs)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
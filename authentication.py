@@ -1,19 +1,35 @@
-from fastapi import Depends, HTTPException, status
+import os
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 import models, schemas, security
-from db import get_db
+from revocation import revocations
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Shared secret for the /internal endpoints (query shapes and plans, pool,
+# cache and replica state). Unset, they are not served at all.
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
+
 def get_user(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> schemas.Principal:
+    # No database access: the principal comes from the token claims, and
+    # logged-out tokens or tokens of changed/deleted users are caught by the
+    # in-process revocation list.
+    if not revocations.loaded:
+        # Fail closed: without the revocation list a logged-out token would pass
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication temporarily unavailable",
+            headers={"Retry-After": "5"},
+        )
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Not valid credentials",
@@ -24,9 +40,25 @@ async def get_current_user(
             token, security.SECURITY_KEY, algorithms=[security.ALGORITHM]
         )
         username:str=payload.get("sub")
-        if username is None:
+        if username is None or payload.get("uid") is None:
             raise credentials_exception
-    except JWTError:
+        principal = schemas.Principal(
+            id=payload["uid"],
+            username=username,
+            email=payload.get("email"),
+            first_name=payload.get("first_name"),
+            last_name=payload.get("last_name"),
+            jti=payload.get("jti"),
+            exp=payload.get("exp"),
+        )
+    except (JWTError, ValidationError):
         raise credentials_exception
-    user = get_user(db, username=username)
-    return user
\ No newline at end of file
+    if revocations.is_revoked(principal.jti, principal.id, payload.get("iat", 0)):
+        raise credentials_exception
+    return principal
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    if not INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_internal_token is None or not secrets.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
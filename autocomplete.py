@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+import models
+
+logger = logging.getLogger(__name__)
+
+# Each worker rebuilds its index from the database this often, which picks up
+# products added or deleted through the other workers. 0 turns it off.
+AUTOCOMPLETE_REBUILD_SECONDS = float(os.getenv("AUTOCOMPLETE_REBUILD_SECONDS", "300"))
+AUTOCOMPLETE_LOAD_BATCH = 10000
+# Batches at least this big are merged into the array in one pass rather than
+# shifting it once per value (see PrefixIndex.update).
+BULK_UPDATE_MIN = 100
+
+SEPARATOR = "\x00"
+
+
+class PrefixIndex:
+    """Sorted array of ``casefolded + SEPARATOR + value`` strings.
+
+    One string per entry keeps the footprint low. A lookup is a bisect to the
+    first entry at or after the prefix plus a slice of k entries. Inserts and
+    deletes shift the array (a memmove of pointers), fine at catalog write
+    rates. With ``counted``, a value shared by several products (a brand)
+    stays until the last one is discarded.
+    """
+
+    def __init__(self, counted: bool = False):
+        self.counted = counted
+        self._entries: List[str] = []
+        self._counts: Optional[Dict[str, int]] = {} if counted else None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(value: str) -> str:
+        return value.casefold() + SEPARATOR + value
+
+    def replace(self, values: Iterable[str]):
+        values = [value for value in values if value]
+        counts = dict(Counter(values)) if self.counted else None
+        entries = sorted({self._entry(value) for value in (counts or values)})
+        with self._lock:
+            self._entries, self._counts = entries, counts
+
+    def add(self, value: Optional[str]):
+        if not value:
+            return
+        with self._lock:
+            if self.counted:
+                self._counts[value] = self._counts.get(value, 0) + 1
+                if self._counts[value] > 1:
+                    return
+            entry = self._entry(value)
+            position = bisect_left(self._entries, entry)
+            if position == len(self._entries) or self._entries[position] != entry:
+                self._entries.insert(position, entry)
+
+    def discard(self, value: Optional[str]):
+        if not value:
+            return
+        with self._lock:
+            if self.counted:
+                remaining = self._counts.get(value, 0) - 1
+                if remaining > 0:
+                    self._counts[value] = remaining
+                    return
+                self._counts.pop(value, None)
+            entry = self._entry(value)
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def update(self, added: Iterable[Optional[str]], discarded: Iterable[Optional[str]] = ()):
+        # Same result as discarding then adding each value, for bulk imports.
+        # The new entries are appended and sorted in: Timsort merges the two
+        # sorted runs in linear time, once for the whole batch.
+        added = [value for value in added if value]
+        discarded = [value for value in discarded if value]
+        if len(added) + len(discarded) < BULK_UPDATE_MIN:
+            for value in discarded:
+                self.discard(value)
+            for value in added:
+                self.add(value)
+            return
+        with self._lock:
+            if self.counted:
+                for value in discarded:
+                    remaining = self._counts.get(value, 0) - 1
+                    if remaining > 0:
+                        self._counts[value] = remaining
+                    else:
+                        self._counts.pop(value, None)
+                for value in added:
+                    self._counts[value] = self._counts.get(value, 0) + 1
+                discarded = [value for value in discarded if value not in self._counts]
+            new = {self._entry(value) for value in added}
+            gone = {self._entry(value) for value in discarded} - new
+            entries = [entry for entry in self._entries if entry not in gone] if gone else list(self._entries)
+            size = len(entries)
+            for entry in new:
+                position = bisect_left(entries, entry, 0, size)
+                if position == size or entries[position] != entry:
+                    entries.append(entry)
+            entries.sort()
+            self._entries = entries
+
+    def complete(self, prefix: str, limit: int) -> List[str]:
+        key = prefix.casefold().replace(SEPARATOR, "")
+        if not key:
+            return []
+        entries = self._entries
+        start = bisect_left(entries, key)
+        matches = []
+        for entry in entries[start:start + limit]:
+            if not entry.startswith(key):
+                break
+            matches.append(entry.partition(SEPARATOR)[2])
+        return matches
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Autocomplete:
+    """Product names and brands, for typeahead without touching the database."""
+
+    def __init__(self):
+        self.names = PrefixIndex()
+        self.brands = PrefixIndex(counted=True)
+        # Changes made while a rebuild is reading the table, replayed on top of it
+        self._pending: Optional[list] = None
+        # Sync endpoints write from threadpool threads; a write must not land
+        # between a rebuild's swap and its replay.
+        self._lock = threading.Lock()
+
+    def add_product(self, name: Optional[str], brand: Optional[str]):
+        with self._lock:
+            self.names.add(name)
+            self.brands.add(brand)
+            if self._pending is not None:
+                self._pending.append((True, name, brand))
+
+    def discard_product(self, name: Optional[str], brand: Optional[str]):
+        with self._lock:
+            self.names.discard(name)
+            self.brands.discard(brand)
+            if self._pending is not None:
+                self._pending.append((False, name, brand))
+
+    def update_products(self, added: List[Tuple[str, str]], discarded: List[Tuple[str, str]] = ()):
+        # (name, brand) pairs; discarded first, as for an update of a product
+        with self._lock:
+            self.names.update([name for name, _ in added], [name for name, _ in discarded])
+            self.brands.update([brand for _, brand in added], [brand for _, brand in discarded])
+            if self._pending is not None:
+                self._pending.extend((False, name, brand) for name, brand in discarded)
+                self._pending.extend((True, name, brand) for name, brand in added)
+
+    def _replay(self, names: List[str], brands: List[str]):
+        # A change made during the load may or may not be in what it read, so
+        # it is applied as a set operation on the (name, brand) pairs (names
+        # are unique): a product already loaded is not added, and so not
+        # counted, twice.
+        pairs = {(name, brand) for _, name, brand in self._pending}
+        loaded = {pair for pair in zip(names, brands) if pair in pairs}
+        final = set(loaded)
+        for added, name, brand in self._pending:
+            (final.add if added else final.discard)((name, brand))
+        added, discarded = final - loaded, loaded - final
+        self.names.update([name for name, _ in added], [name for name, _ in discarded])
+        self.brands.update([brand for _, brand in added], [brand for _, brand in discarded])
+
+    def complete(self, prefix: str, limit: int) -> dict:
+        return {"names": self.names.complete(prefix, limit), "brands": self.brands.complete(prefix, limit)}
+
+    async def load(self, db):
+        self._pending = []
+        try:
+            names, brands = [], []
+            result = await db.stream(
+                select(models.Product.name, models.Product.brand).execution_options(yield_per=AUTOCOMPLETE_LOAD_BATCH)
+            )
+            async for partition in result.partitions():
+                for name, brand in partition:
+                    names.append(name)
+                    brands.append(brand)
+            with self._lock:
+                self.names.replace(names)
+                self.brands.replace(brands)
+                if self._pending:
+                    self._replay(names, brands)
+                self._pending = None
+        finally:
+            self._pending = None
+
+    def stats(self) -> dict:
+        return {"names": len(self.names), "brands": len(self.brands)}
+
+
+products = Autocomplete()
+
+
+async def load_and_rebuild(session_factory):
+    # The first load runs here too, in the background, so a new worker takes
+    # requests at once; suggestions fill in when it is done. load() keeps the
+    # writes made meanwhile, as it does for the rebuilds.
+    while True:
+        try:
+            async with session_factory() as db:
+                await products.load(db)
+        except Exception:
+            logger.exception("Autocomplete load failed")
+        if AUTOCOMPLETE_REBUILD_SECONDS <= 0:
+            return
+        await asyncio.sleep(AUTOCOMPLETE_REBUILD_SECONDS)
@@ -0,0 +1,146 @@
+"""Throughput against in-flight request count, sync vs async data access.
+
+Serves one product page two ways from an in-process ASGI app:
+
+* ``/sync``  -- an ``async def`` endpoint calling ``crud.get_products`` through a
+  sync Session, the pattern main.py used before (the query runs on the loop).
+* ``/async`` -- the same endpoint on ``async_crud.get_products`` and an AsyncSession.
+
+``--delay-ms`` adds server-side query time to every request (``pg_sleep`` on
+Postgres, a sleeping SQL function on SQLite) so the cost of a blocked loop is
+visible even on a fast local database.
+
+    python -m benchmarks.bench_async_db [--url URL] [--concurrency 1 4 16 64]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import configure
+
+
+def register_sleep(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("bench_sleep", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+def build_app(url: str, delay_ms: float, pool_size: int):
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import async_crud, crud, models
+    from async_db import to_async_url
+    from db import connect_args_for
+
+    # Pools sized to the highest in-flight count, so neither side waits on a
+    # checkout (aiosqlite file databases use NullPool and take no pool size).
+    engine = create_engine(url, connect_args=connect_args_for(url), pool_size=pool_size)
+    async_pool = {} if url.startswith("sqlite") else {"pool_size": pool_size}
+    async_engine = create_async_engine(to_async_url(url), **async_pool)
+    if url.startswith("sqlite"):
+        register_sleep(engine)
+        register_sleep(async_engine.sync_engine)
+        delay = text("SELECT bench_sleep(:ms)").bindparams(ms=delay_ms)
+    else:
+        delay = text("SELECT pg_sleep(:s)").bindparams(s=delay_ms / 1000)
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    with Session() as db:
+        if not db.query(models.Product).first():
+            db.add_all(models.Product(name=f"bench-{i}", price=i, brand="bench") for i in range(200))
+            db.commit()
+
+    def get_db():
+        with Session() as db:
+            yield db
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_page(db=Depends(get_db)):
+        if delay_ms:
+            db.execute(delay)
+        products, _ = crud.get_products(db, limit=50)
+        return len(products)
+
+    @app.get("/async")
+    async def async_page(db=Depends(get_async_db)):
+        if delay_ms:
+            await db.execute(delay)
+        products, _ = await async_crud.get_products(db, limit=50)
+        return len(products)
+
+    return app
+
+
+async def measure(app, path: str, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "path": path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="sync database URL (default: a temporary SQLite file)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per measurement")
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_async.db")
+    configure(url)
+    app = build_app(url, args.delay_ms, pool_size=max(args.concurrency))
+
+    async def run_all():
+        results = []
+        for concurrency in args.concurrency:
+            for path in ("/sync", "/async"):
+                result = await measure(app, path, concurrency, args.duration)
+                results.append(result)
+                print(f"{path:7} in_flight={concurrency:<4} rps={result['rps']:8.1f} "
+                      f"p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms")
+        return results
+
+    print(json.dumps(asyncio.run(run_all()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Memory and lookup latency of the autocomplete prefix index.
+
+Builds autocomplete.PrefixIndex over N synthetic product names (default one
+million) and reports the index's own memory (tracemalloc), the bytes per name
+and MB per million names, lookup latency for 1-4 character prefixes, and the
+cost of an incremental add/discard. For comparison it times the query the
+index replaces, ``name LIKE 'abc%' LIMIT k`` on an indexed SQLite table.
+
+    python -m benchmarks.bench_autocomplete [--names 1000000] [--k 10]
+"""
+import argparse
+import json
+import random
+import sqlite3
+import time
+import tracemalloc
+
+from benchmarks.bench_search import COLORS, ITEMS, MATERIALS
+from benchmarks.common import DEFAULT_URL, configure, percentile
+
+
+def synthetic_names(count: int):
+    rng = random.Random(11)
+    words = COLORS + MATERIALS + ITEMS
+    return [f"{rng.choice(words).title()} {rng.choice(words)} {rng.choice(ITEMS)} {i}" for i in range(count)]
+
+
+def latencies(fn, prefixes) -> dict:
+    samples = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        fn(prefix)
+        samples.append(time.perf_counter() - started)
+    return {"p50_us": percentile(samples, 50) * 1e6, "p99_us": percentile(samples, 99) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=1_000_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+
+    configure(DEFAULT_URL)
+    from autocomplete import PrefixIndex
+
+    names = synthetic_names(args.names)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    index = PrefixIndex()
+    index.replace(names)
+    build_seconds = time.perf_counter() - started
+    index_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    rng = random.Random(3)
+    results = {
+        "names": args.names,
+        "build_seconds": build_seconds,
+        "index_bytes": index_bytes,
+        "bytes_per_name": index_bytes / args.names,
+        "mb_per_million_names": index_bytes / args.names * 1e6 / 2**20,
+        "lookup": {},
+        "like_query": {},
+    }
+    samples = [rng.choice(names) for _ in range(args.lookups)]
+    # Short prefixes match many names; "specific" is a whole name but its last character.
+    cases = {1: 1, 2: 2, 3: 3, 4: 4, "specific": -1}
+    for case, end in cases.items():
+        prefixes = [name[:end] for name in samples]
+        results["lookup"][case] = latencies(lambda p: index.complete(p, args.k), prefixes)
+
+    updates = [f"Zz new product {i}" for i in range(1000)]
+    started = time.perf_counter()
+    for name in updates:
+        index.add(name)
+    for name in updates:
+        index.discard(name)
+    results["add_discard_us"] = (time.perf_counter() - started) / (2 * len(updates)) * 1e6
+
+    # The query the endpoint replaces. LIKE is case-insensitive in SQLite, so
+    # the name index cannot serve it; case_sensitive_like would allow a range
+    # scan but no longer match "abc" against "Abc...". The scan stops after k
+    # matches, so it is cheap for short prefixes and slow for specific ones.
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE products (name TEXT UNIQUE)")
+    connection.executemany("INSERT INTO products VALUES (?)", ((name,) for name in names))
+    for case in (1, 3, "specific"):
+        prefixes = [name[:cases[case]].lower() + "%" for name in samples[:200]]
+        query = "SELECT name FROM products WHERE name LIKE ? LIMIT ?"
+        results["like_query"][case] = latencies(
+            lambda p: connection.execute(query, (p, args.k)).fetchall(), prefixes
+        )
+
+    print(
+        f"{args.names} names: {index_bytes / 2**20:.1f} MiB, {results['bytes_per_name']:.0f} B/name, "
+        f"{results['mb_per_million_names']:.1f} MiB per million, built in {build_seconds:.2f}s"
+    )
+    for case, result in results["lookup"].items():
+        print(f"prefix {case}: p50 {result['p50_us']:.2f} µs  p99 {result['p99_us']:.2f} µs")
+    print(f"add/discard: {results['add_discard_us']:.1f} µs")
+    for case, result in results["like_query"].items():
+        print(f"LIKE prefix {case}: p50 {result['p50_us']:.0f} µs  p99 {result['p99_us']:.0f} µs")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Proves that N concurrent identical reads cost exactly one query.
+
+Async: N concurrent GET /products/{id} against the in-process app with a cold
+product cache. Sync: N threads calling crud.get_product_cached at once, with
+the query slowed down so they all arrive while it is in flight. Exits
+non-zero if either side issues more than one product query.
+
+    python -m benchmarks.bench_coalescing [--callers 200]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import QueryCounter, configure
+
+
+def count_selects(statements):
+    return sum(1 for statement in statements if statement.lstrip().upper().startswith("SELECT"))
+
+
+class StatementLog(QueryCounter):
+    def __init__(self, engine, delay: float = 0.0):
+        super().__init__(engine)
+        self.delay = delay
+        self.log = []
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        super()._on_execute()
+        self.log.append(statement)
+        if self.delay:
+            time.sleep(self.delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--callers", type=int, default=200)
+    args = parser.parse_args()
+
+    configure("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_coalescing.db"))
+    import httpx
+    import async_db, cache, crud, db, main as app_module, models
+
+    models.Base.metadata.create_all(bind=db.engine)
+    with db.SessionLocal() as session:
+        product = models.Product(name="viral", price=1, brand="bench")
+        session.add(product)
+        session.commit()
+        product_id = product.id
+
+    # Async endpoints
+    cache.products.local.clear()
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            responses = await asyncio.gather(*(client.get(f"/products/{product_id}") for _ in range(args.callers)))
+        assert all(response.status_code == 200 for response in responses)
+
+    with StatementLog(async_db.async_engine.sync_engine) as log:
+        started = time.perf_counter()
+        asyncio.run(burst())
+        elapsed = time.perf_counter() - started
+    async_queries = count_selects(log.log)
+    print(f"async: {args.callers} callers -> {async_queries} query in {elapsed * 1000:.1f}ms")
+
+    # Sync callers
+    cache.products.local.clear()
+    barrier = threading.Barrier(args.callers)
+
+    def call():
+        with db.SessionLocal() as session:
+            barrier.wait()
+            return crud.get_product_cached(session, product_id)
+
+    with StatementLog(db.engine, delay=0.2) as log, ThreadPoolExecutor(args.callers) as pool:
+        results = list(pool.map(lambda _: call(), range(args.callers)))
+    sync_queries = count_selects(log.log)
+    assert all(result is not None for result in results)
+    print(f"sync:  {args.callers} callers -> {sync_queries} query")
+
+    if async_queries != 1 or sync_queries != 1:
+        sys.exit("expected exactly one query per burst")
+
+
+if __name__ == "__main__":
+    main()
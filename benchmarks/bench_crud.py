@@ -0,0 +1,280 @@
+"""Per-call cost of the crud.py and security.py functions, with budgets.
+
+For each data size (products; orders and reviews scale with it, users stay
+at USERS so order histories grow too) it seeds a fresh database with
+benchmarks/seed.py and measures every case of build_cases(), one session
+per call:
+
+    wall time     p50/p95/p99 over --rounds of --repeat calls, and the best
+                  round's p50
+    allocations   peak traced memory of one call (tracemalloc), median of 5
+    statements    SQL statements sent by one call, the most seen
+
+It fails (exit status 1) when a case sends more statements than its
+budget, whatever the data size, so an N+1 cannot come back. With --baseline
+it also fails when a case's statement count grew at all, or its best p50
+or its allocations grew by more than --threshold percent (and the p50 by
+more than --min-delta-ms). --save-baseline writes this run as the new
+baseline. Timings are only comparable on the same machine, so keep the
+baseline next to where it is checked.
+
+The security cases do not touch the database and run once, not per size.
+Their bcrypt cost follows BCRYPT_ROUNDS.
+
+    python -m benchmarks.bench_crud [--sizes 1000 10000 100000] [--baseline FILE] [--save-baseline FILE]
+
+A non-SQLite --url must name a scratch database, and needs --drop-tables:
+each size drops and recreates every table in it.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import tracemalloc
+import uuid
+
+from benchmarks.common import QueryCounter, configure, percentile, stopwatch, summarize
+from benchmarks.seed import row_id, username
+
+USERS = 50
+ALLOCATION_RUNS = 5
+
+
+class Case:
+    def __init__(self, name: str, budget: int, call, repeat: int = 200, database: bool = True):
+        self.name = name
+        self.budget = budget
+        self.call = call  # call(db, i); db is None for cases without database
+        self.repeat = repeat
+        self.database = database
+
+
+def order(product_count: int):
+    import schemas
+    from enums import PaymentMethodEnum
+
+    def call(db, i):
+        import crud
+
+        crud.set_order(db, schemas.OrderCreate(
+            user_id=row_id("user", i % USERS),
+            shipping_address="1 Bench Street",
+            payment_method=PaymentMethodEnum.CARD,
+            product_ids=[row_id("product", i + p) for p in range(product_count)],
+        ))
+    return call
+
+
+def build_cases():
+    import crud, schemas, security
+
+    hashed = security.get_password_hash("bench-password")
+    claims = {"sub": "bench", "uid": str(uuid.uuid4()), "email": "bench@example.com"}
+    # Index 0 has the longest history: the seed skews orders and reviews to it
+    hot_product = row_id("product", 0)
+
+    def cached_product(db, i):
+        if crud.get_product_cached(db, id=hot_product) is None:
+            raise AssertionError("product missing")
+
+    def user_orders(db, i):
+        items, _ = crud.get_user_orders(db, owner_id=row_id("user", i % USERS))
+
+    def create_review(db, i):
+        crud.create_review(
+            db, schemas.ReviewCreate(product_id=row_id("product", i % 100), review_content=f"bench {i}"),
+            user_id=row_id("user", i % USERS),
+        )
+
+    review_products = {}  # per engine: every size has its own reviews
+
+    def update_review(db, i):
+        # Same product, new text: the products' review stats stay as they are
+        if db.bind not in review_products:
+            from sqlalchemy import select
+
+            import models
+
+            reviews = [row_id("review", k) for k in range(100)]
+            review_products[db.bind] = dict(db.execute(
+                select(models.Review.id, models.Review.product_id).where(models.Review.id.in_(reviews))
+            ).all())
+        review_id = row_id("review", i % 100)
+        crud.update_review(
+            db, review_id,
+            schemas.ReviewUpdate(product_id=review_products[db.bind][review_id], review_content=f"edited {i}"),
+        )
+
+    def next_products_page(db, i):
+        _, cursor = crud.get_products(db, limit=50)
+        crud.get_products(db, limit=50, cursor=cursor)
+
+    cases = [
+        Case("security.create_access_token", 0, lambda db, i: security.create_access_token(claims), 2000, False),
+        Case("security.get_password_hash", 0, lambda db, i: security.get_password_hash("bench-password"), 5, False),
+        Case("security.verify_and_update_password", 0,
+             lambda db, i: security.verify_and_update_password("bench-password", hashed), 5, False),
+        Case("crud.get_user", 1, lambda db, i: crud.get_user(db, username=username(i % USERS))),
+        Case("crud.update_user", 4, lambda db, i: crud.update_user(
+            db, username(i % USERS), schemas.UserUpdate(first_name=f"Bench{i}"))),
+        Case("crud.get_product", 1, lambda db, i: crud.get_product(db, id=row_id("product", i))),
+        Case("crud.get_product_cached", 0, cached_product),
+        Case("crud.get_products", 1, lambda db, i: crud.get_products(db, limit=50)),
+        Case("crud.get_products brand", 1, lambda db, i: crud.get_products(db, limit=50, brand=f"brand{i % 100}")),
+        Case("crud.get_products two pages", 2, next_products_page),
+        Case("crud.search_products", 1, lambda db, i: crud.search_products(db, q="red leather", limit=50)),
+        Case("crud.set_order 1 item", 3, order(1)),
+        Case("crud.set_order 50 items", 3, order(50)),
+        Case("crud.get_order_detail", 2, lambda db, i: crud.get_order_detail(
+            db, order_id=row_id("order", i % 100), owner_id=row_id("user", 0))),
+        Case("crud.get_user_orders", 2, user_orders),
+        Case("crud.create_review", 3, create_review),
+        Case("crud.get_product_reviews", 1, lambda db, i: crud.get_product_reviews(db, product_id=hot_product)),
+        Case("crud.update_review", 3, update_review),
+    ]
+    return cases
+
+
+def measure(case: Case, Session, engine, rounds: int) -> dict:
+    from contextlib import nullcontext
+
+    def session():
+        return Session() if case.database else nullcontext()
+
+    # Two calls first, so statement compilation and caches are not measured
+    for i in range(2):
+        with session() as db:
+            case.call(db, i)
+
+    samples, round_p50s, statements, commits = [], [], 0, 0
+    for _ in range(rounds):
+        round_samples = []
+        for i in range(case.repeat):
+            with session() as db:
+                with QueryCounter(engine) as counter, stopwatch(round_samples):
+                    case.call(db, i)
+            statements, commits = max(statements, counter.statements), max(commits, counter.commits)
+        samples += round_samples
+        round_p50s.append(percentile(round_samples, 50))
+
+    peaks = []
+    for i in range(ALLOCATION_RUNS):
+        with session() as db:
+            tracemalloc.start()
+            try:
+                case.call(db, i)
+                peaks.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+    return {
+        **summarize(samples),
+        # What the baseline compares: on a busy machine the best round is
+        # the most repeatable figure
+        "best_p50_ms": min(round_p50s) * 1000,
+        "alloc_kib": statistics.median(peaks) / 1024,
+        "statements": statements,
+        "commits": commits,
+        "budget": case.budget,
+    }
+
+
+def check(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    failures = []
+    for key, now in results.items():
+        if now["statements"] > now["budget"]:
+            failures.append(f"{key}: {now['statements']} statements, budget {now['budget']}")
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if now["statements"] > before["statements"]:
+            failures.append(f"{key}: {now['statements']} statements, baseline {before['statements']}")
+        for metric, floor in (("best_p50_ms", min_delta_ms), ("alloc_kib", 0)):
+            grown = now[metric] - before[metric]
+            if before[metric] and grown > floor and grown / before[metric] * 100 > threshold:
+                failures.append(f"{key}: {metric} {before[metric]:.3f} -> {now[metric]:.3f}, over +{threshold:g}%")
+    return failures
+
+
+def fresh_engine(url: str, size: int):
+    from sqlalchemy import create_engine
+
+    import models
+
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), f"bench_crud_{size}.db")
+    engine = create_engine(url)
+    if engine.dialect.name != "sqlite":
+        models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--drop-tables", action="store_true", help="allow dropping every table of a non-SQLite --url")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=None, help="calls per database case (default 200)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=25.0, help="allowed regression, in percent")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="slowdowns smaller than this never fail")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--save-baseline", default=None)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    if args.url is not None and not args.drop_tables:
+        from sqlalchemy.engine import make_url
+
+        if make_url(args.url).get_backend_name() != "sqlite":
+            parser.error("each size drops every table of --url; pass --drop-tables if it is a scratch database")
+
+    configure(args.url or "sqlite://")
+    from sqlalchemy.orm import sessionmaker
+
+    import cache, search  # search registers the SQLite FTS5 fallback with create_all
+    from benchmarks.seed import seed
+
+    cases = build_cases()
+    results = {}
+    for size in [None] + args.sizes:
+        engine = fresh_engine(args.url, size or 0)
+        if size is not None:
+            seed(engine, USERS, size, size // 10, size // 2)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # Every size starts cold; the cached case warms its entry in its first call
+        cache.products.local.clear()
+        for case in cases:
+            if case.database != (size is not None):
+                continue
+            if args.repeat and case.database:
+                case.repeat = args.repeat
+            key = case.name if size is None else f"{case.name} @{size}"
+            results[key] = measure(case, Session, engine, args.rounds)
+            stats = results[key]
+            print(
+                f"{key:40} best p50={stats['best_p50_ms']:8.3f}ms p95={stats['p95_ms']:8.3f}ms "
+                f"alloc={stats['alloc_kib']:8.1f}KiB statements={stats['statements']}/{stats['budget']}"
+            )
+        engine.dispose()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["cases"]
+    failures = check(results, baseline, args.threshold, args.min_delta_ms)
+    report = {"dialect": engine.dialect.name, "sizes": args.sizes, "cases": results, "failures": failures}
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as file:
+                json.dump(report, file, indent=2)
+    for failure in failures:
+        print("FAIL", failure)
+    if failures:
+        sys.exit(1)
+    print(f"{len(results)} cases within budget" + (" and baseline" if baseline else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Throughput of POST /products/import against one POST /products/ per row.
+
+Streams N synthetic products (default 100000) to the import endpoint as CSV
+and as NDJSON, first into an empty catalog (all inserts) and then again
+(all updates), and reports rows/sec including parsing, validation and the
+cache upkeep. For comparison it posts a sample of rows one at a time, the way
+suppliers were onboarded before. On SQLite the load is a batched executemany;
+pass a PostgreSQL --url to measure the COPY path.
+
+    python -m benchmarks.bench_import [--rows 100000] [--single 1000] [--url URL]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import orjson
+
+from benchmarks.bench_search import BRANDS, COLORS, ITEMS, MATERIALS
+from benchmarks.common import configure
+
+UPLOAD_PIECE = 64 * 1024
+
+
+def synthetic_rows(count: int, prefix: str = ""):
+    rng = random.Random(5)
+    for i in range(count):
+        yield {
+            "name": f"{prefix}{rng.choice(COLORS)} {rng.choice(MATERIALS)} {rng.choice(ITEMS)} {i}",
+            "price": rng.randint(100, 50000) / 100,
+            "brand": f"brand{rng.randrange(BRANDS)}",
+        }
+
+
+def encode(rows, format: str) -> bytes:
+    if format == "csv":
+        import csv
+        import io
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=("name", "price", "brand"))
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+    return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
+async def upload(client, body: bytes, format: str, headers: dict) -> dict:
+    async def pieces():
+        for start in range(0, len(body), UPLOAD_PIECE):
+            yield body[start:start + UPLOAD_PIECE]
+
+    response = await client.post(f"/products/import?format={format}", content=pieces(), headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def login() -> dict:
+    # A user to import as, and what the app's startup does before it accepts
+    # tokens: the in-process client does not run the startup events.
+    import async_db, models, revocation, security
+
+    async with async_db.AsyncSessionLocal() as db:
+        user = models.User(
+            username="importer", email="importer@example.com", hashed_password="x", first_name="Bench", last_name="Importer"
+        )
+        db.add(user)
+        await db.commit()
+    await revocation.refresh_once(async_db.AsyncSessionLocal)
+    return {"Authorization": f"Bearer {security.create_access_token(data=security.user_claims(user))}"}
+
+
+async def run(app, args) -> dict:
+    import httpx
+
+    headers = await login()
+    results = {"rows": args.rows, "import": [], "single": None}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for format in ("csv", "ndjson"):
+            body = encode(synthetic_rows(args.rows, prefix=format + " "), format)
+            for label in ("insert", "update"):
+                started = time.perf_counter()
+                outcome = await upload(client, body, format, headers)
+                seconds = time.perf_counter() - started
+                assert outcome["failed"] == 0 and outcome["inserted" if label == "insert" else "updated"] == args.rows
+                results["import"].append({
+                    "format": format, "case": label, "bytes": len(body),
+                    "seconds": seconds, "rows_per_sec": args.rows / seconds,
+                })
+                print(f"import {format:6} {label:6} {args.rows} rows in {seconds:6.2f}s  {args.rows / seconds:9.0f} rows/s")
+
+        started = time.perf_counter()
+        for row in synthetic_rows(args.single, prefix="single "):
+            (await client.post("/products/", json=row)).raise_for_status()
+        seconds = time.perf_counter() - started
+        results["single"] = {"rows": args.single, "seconds": seconds, "rows_per_sec": args.single / seconds}
+        print(f"POST /products/ one by one: {args.single} rows in {seconds:.2f}s  {args.single / seconds:.0f} rows/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--single", type=int, default=1000)
+    args = parser.parse_args()
+
+    configure(args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+    import db, main as app_module, models
+
+    models.Base.metadata.create_all(bind=db.engine)
+    results = asyncio.run(run(app_module.app, args))
+    results["dialect"] = db.engine.dialect.name
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Login storm: /token throughput and event-loop responsiveness during it.
+
+Fires ``--logins`` concurrent logins at the in-process app while a probe
+requests a cheap endpoint (GET /products/) in a loop. Run once with bcrypt
+verified inline on the loop (the previous /token behaviour, mounted here as
+/token-inline) and once through the bounded hashing pool. Reports login
+throughput, how many were shed with 503, and the probe's latency.
+
+    python -m benchmarks.bench_login_storm [--logins 64] [--workers 4] [--queue-limit 16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.common import configure, percentile
+
+
+async def storm(client, path: str, logins: int) -> dict:
+    statuses = {}
+    probe = []
+    done = asyncio.Event()
+
+    async def login():
+        response = await client.post(path, data={"username": "storm", "password": "storm-password"})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def probe_loop():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/products/")
+            probe.append(time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    prober = asyncio.create_task(probe_loop())
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await prober
+
+    return {
+        "path": path,
+        "logins": logins,
+        "elapsed_s": elapsed,
+        "accepted_per_s": statuses.get(200, 0) / elapsed,
+        "statuses": statuses,
+        "probe_requests": len(probe),
+        "probe_p50_ms": percentile(probe, 50) * 1000,
+        "probe_max_ms": max(probe, default=0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="database URL (default: a temporary SQLite file)")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-limit", type=int, default=16)
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_login.db")
+    configure(url)
+    os.environ["HASH_POOL_WORKERS"] = str(args.workers)
+    os.environ["HASH_POOL_QUEUE_LIMIT"] = str(args.queue_limit)
+
+    import httpx
+    from fastapi import Depends, HTTPException
+    from fastapi.security import OAuth2PasswordRequestForm
+
+    import async_crud, main as app_module, models, security
+    from async_db import get_async_db
+    from db import engine, SessionLocal
+
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        if not db.query(models.User).filter(models.User.username == "storm").first():
+            db.add(models.User(username="storm", email="storm@bench.local",
+                               hashed_password=security.get_password_hash("storm-password")))
+            db.commit()
+
+    app = app_module.app
+
+    @app.post("/token-inline")
+    async def token_inline(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_async_db)):
+        user = await async_crud.get_user(db, username=form_data.username)
+        if not user or not security.pwd_context.verify(form_data.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"access_token": security.create_access_token({"sub": user.username}), "token_type": "bearer"}
+
+    async def run_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return [await storm(client, path, args.logins) for path in ("/token-inline", "/token")]
+
+    results = asyncio.run(run_all())
+    for result in results:
+        print(f"{result['path']:13} accepted/s={result['accepted_per_s']:6.1f} statuses={result['statuses']} "
+              f"probe p50={result['probe_p50_ms']:.1f}ms max={result['probe_max_ms']:.1f}ms")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Query budget and latency of GET /orders/{id} and GET /users/me/orders.
+
+Counts the statements each request sends, for orders of 1, 10 and 100 line
+items and for a page of order history. It compares them with lazy loading,
+which renders the same order through the relationships one query at a time.
+Exits non-zero when a request goes over QUERY_BUDGET, whatever the number of
+items, so it can gate CI.
+
+    python -m benchmarks.bench_orders [--repeat 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from decimal import Decimal
+
+from benchmarks.common import QueryCounter, configure, stopwatch, summarize
+
+QUERY_BUDGET = 3
+ITEM_COUNTS = (1, 10, 100)
+HISTORY_ORDERS = 30
+HISTORY_ITEMS = 20
+
+
+def lazy_render(session, order_id):
+    # What rendering an order cost before: 1 + N lazy loads
+    import models
+
+    order = session.get(models.Order, order_id)
+    return [(line.product.name, line.product.price) for line in order.order_products]
+
+
+def seed():
+    import crud, db, models, schemas, security
+    from enums import PaymentMethodEnum
+
+    with db.SessionLocal() as session:
+        user = models.User(
+            username="buyer", email="buyer@example.com", hashed_password="x", first_name="Bench", last_name="Buyer"
+        )
+        products = [models.Product(name=f"item-{i}", price=Decimal("9.99"), brand="bench") for i in range(max(ITEM_COUNTS))]
+        session.add(user)
+        session.add_all(products)
+        session.commit()
+        product_ids = [product.id for product in products]
+
+        def order(items):
+            data = schemas.OrderCreate(
+                user_id=user.id, product_ids=product_ids[:items],
+                shipping_address="1 Bench Street", payment_method=PaymentMethodEnum.CARD,
+            )
+            return crud.set_order(session, data).id
+
+        for _ in range(HISTORY_ORDERS):
+            order(HISTORY_ITEMS)
+        orders = {items: order(items) for items in ITEM_COUNTS}
+        return security.create_access_token(data=security.user_claims(user)), orders
+
+
+async def measure(app, engine, token, path, repeat):
+    import httpx
+
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        with QueryCounter(engine) as counter:
+            (await client.get(path, headers=headers)).raise_for_status()
+        for _ in range(repeat):
+            with stopwatch(samples):
+                (await client.get(path, headers=headers)).raise_for_status()
+    return counter.statements, summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    configure("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_orders.db"))
+    import async_db, db, main as app_module, models, revocation
+
+    models.Base.metadata.create_all(bind=db.engine)
+    token, orders = seed()
+    # What the app's startup does before it accepts tokens; the in-process
+    # client does not run the startup events.
+    asyncio.run(revocation.refresh_once(async_db.AsyncSessionLocal))
+    engine = async_db.async_engine.sync_engine
+
+    results, over_budget = [], []
+    cases = [(f"GET /orders/{{id}} ({items} items)", f"/orders/{orders[items]}", orders[items]) for items in ITEM_COUNTS]
+    cases.append((f"GET /users/me/orders?limit={HISTORY_ORDERS}", f"/users/me/orders?limit={HISTORY_ORDERS}", None))
+    for label, path, order_id in cases:
+        queries, latency = asyncio.run(measure(app_module.app, engine, token, path, args.repeat))
+        lazy = None
+        if order_id is not None:
+            with db.SessionLocal() as session, QueryCounter(db.engine) as counter:
+                lazy_render(session, order_id)
+            lazy = counter.statements
+        results.append({"request": label, "queries": queries, "lazy_queries": lazy, "latency": latency})
+        print(
+            f"{label:38} {queries} queries (budget {QUERY_BUDGET})"
+            + (f", lazy loading: {lazy}" if lazy is not None else "")
+            + f"  p50 {latency['p50_ms']:.2f} ms"
+        )
+        if queries > QUERY_BUDGET:
+            over_budget.append(label)
+
+    print(json.dumps(results, indent=2))
+    if over_budget:
+        print(f"over the query budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
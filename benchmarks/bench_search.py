@@ -0,0 +1,128 @@
+"""Latency of GET /products/search queries on a large catalog.
+
+Seeds N products (default one million), then times crud.search_products for
+queries of different selectivity, first page and a later page via the cursor.
+For comparison it also times the naive alternative, a LIKE '%term%' scan over
+name and brand. On SQLite the search uses the FTS5 fallback. Pass a
+PostgreSQL --url to measure the tsvector GIN index.
+
+    python -m benchmarks.bench_search [--products 1000000] [--url URL]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import configure, stopwatch, summarize
+
+COLORS = ("red", "blue", "green", "black", "white", "grey", "navy", "olive", "coral", "amber", "ivory", "teal")
+MATERIALS = ("cotton", "leather", "wool", "linen", "denim", "silk", "canvas", "suede", "nylon", "bamboo")
+ITEMS = (
+    "shoe", "boot", "sneaker", "sandal", "jacket", "coat", "shirt", "sweater", "hoodie", "scarf",
+    "hat", "cap", "glove", "belt", "bag", "backpack", "wallet", "watch", "sock", "dress",
+)
+BRANDS = 5000
+
+QUERIES = {
+    "common term": "red",
+    "two terms": "red leather",
+    "three terms": "navy wool coat",
+    "rare brand": "brand4242",
+    "no match": "unicorn",
+}
+
+
+def seed(engine, products: int, batch: int = 20000):
+    import models
+
+    rng = random.Random(7)
+    started = datetime.utcnow() - timedelta(days=365)
+    table = models.Product.__table__
+    with engine.begin() as connection:
+        for offset in range(0, products, batch):
+            rows = []
+            for i in range(offset, min(offset + batch, products)):
+                name = f"{rng.choice(COLORS)} {rng.choice(MATERIALS)} {rng.choice(ITEMS)} {i}"
+                created_at = started + timedelta(seconds=i)
+                rows.append({
+                    "id": uuid.uuid4(), "name": name, "price": rng.randint(100, 50000) / 100,
+                    "brand": f"brand{rng.randrange(BRANDS)}", "created_at": created_at, "updated_at": created_at,
+                })
+            connection.execute(table.insert(), rows)
+
+
+def like_scan(db, term: str, limit: int):
+    # What searching looks like without a text index
+    from sqlalchemy import or_, select
+
+    import models
+
+    pattern = f"%{term}%"
+    statement = (
+        select(models.Product)
+        .where(or_(models.Product.name.ilike(pattern), models.Product.brand.ilike(pattern)))
+        .order_by(models.Product.created_at, models.Product.id)
+        .limit(limit)
+    )
+    return db.scalars(statement).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--like-repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    configure(args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_search.db"))
+    import crud, db, models, search
+
+    models.Base.metadata.create_all(bind=db.engine)
+    seed_started = time.perf_counter()
+    seed(db.engine, args.products)
+    print(f"seeded {args.products} products in {time.perf_counter() - seed_started:.1f}s")
+
+    results = {"dialect": db.engine.dialect.name, "products": args.products, "queries": []}
+    with db.SessionLocal() as session:
+        for label, q in QUERIES.items():
+            first, later, scan = [], [], []
+            for _ in range(args.repeat):
+                with stopwatch(first):
+                    rows, cursor = crud.search_products(session, q, limit=args.limit)
+            # Third page: the cursor is decoded and the keyset filter applied
+            for _ in range(2):
+                if cursor:
+                    rows, cursor = crud.search_products(session, q, limit=args.limit, cursor=cursor)
+            third = cursor
+            if third:
+                for _ in range(args.repeat):
+                    with stopwatch(later):
+                        crud.search_products(session, q, limit=args.limit, cursor=third)
+            term = search.terms_of(q)[0]
+            for _ in range(args.like_repeat):
+                with stopwatch(scan):
+                    like_scan(session, term, args.limit)
+            result = {
+                "query": label, "q": q,
+                "first_page": summarize(first),
+                "later_page": summarize(later) if later else None,
+                "like_scan_first_term": summarize(scan),
+            }
+            results["queries"].append(result)
+            print(
+                f"{label:12} first p50 {result['first_page']['p50_ms']:8.2f} ms"
+                f"  p95 {result['first_page']['p95_ms']:8.2f} ms"
+                + (f"  page3 p50 {result['later_page']['p50_ms']:8.2f} ms" if later else "")
+                + f"  | LIKE scan p50 {result['like_scan_first_term']['p50_ms']:9.2f} ms"
+            )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
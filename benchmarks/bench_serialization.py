@@ -0,0 +1,97 @@
+"""Serialization cost of product pages: µs per row and requests/sec.
+
+Encoders compared on the same list of ORM rows:
+
+* ``fastapi``   -- what the default path does: validate every row through the
+  response model (from_attributes), jsonable-encode, stdlib json.dumps.
+* ``adapter``   -- serialization.product_page_json: a precompiled TypeAdapter,
+  validate + dump_json in pydantic-core.
+
+Then GET /products/?limit=N through the in-process app with FAST_RESPONSES
+off and on.
+
+    python -m benchmarks.bench_serialization [--rows 200] [--requests 300]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import timeit
+from decimal import Decimal
+from typing import List
+
+
+def encoder_costs(rows: int, repeat: int) -> List[dict]:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    import models, schemas, serialization
+
+    products = [
+        models.Product(name=f"product-{i}", price=Decimal("19.99"), brand="bench", review_count=0)
+        for i in range(rows)
+    ]
+    page_adapter = TypeAdapter(schemas.ProductPage)
+
+    def fastapi_default():
+        page = page_adapter.validate_python({"items": products, "next_cursor": None}, from_attributes=True)
+        return json.dumps(jsonable_encoder(page)).encode("utf-8")
+
+    def adapter():
+        return serialization.product_page_json(products, None)
+
+    assert json.loads(fastapi_default()) == json.loads(adapter())
+
+    results = []
+    for name, fn in (("fastapi", fastapi_default), ("adapter", adapter)):
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        results.append({"encoder": name, "rows": rows, "us_per_row": best / rows * 1e6})
+    return results
+
+
+async def request_rate(app, rows: int, requests: int) -> float:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(f"/products/?limit={rows}")
+        started = time.perf_counter()
+        for _ in range(requests):
+            (await client.get(f"/products/?limit={rows}")).raise_for_status()
+        return requests / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    from benchmarks.common import configure
+
+    configure("sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_serialization.db"))
+    import db, main as app_module, models, serialization
+
+    results = {"encoders": encoder_costs(args.rows, args.repeat), "endpoint": []}
+    for result in results["encoders"]:
+        print(f"{result['encoder']:8} {result['us_per_row']:7.2f} µs/row")
+
+    models.Base.metadata.create_all(bind=db.engine)
+    with db.SessionLocal() as session:
+        session.add_all(
+            models.Product(name=f"product-{i}", price=Decimal("19.99"), brand="bench") for i in range(args.rows)
+        )
+        session.commit()
+    for fast in (False, True):
+        serialization.FAST_RESPONSES = fast
+        rps = asyncio.run(request_rate(app_module.app, args.rows, args.requests))
+        results["endpoint"].append({"fast_responses": fast, "limit": args.rows, "rps": rps})
+        print(f"GET /products/?limit={args.rows} FAST_RESPONSES={int(fast)}: {rps:7.1f} req/s")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""The load test's workload on each serve.py event loop and HTTP parser.
+
+Runs benchmarks/load_test.py's mixed workload against the app started by
+serve.py once per configuration, default loop first:
+
+    asyncio + h11         what uvicorn uses without uvloop and httptools
+    uvloop + httptools    serve.py's default when both are installed
+
+and prints each endpoint's p95 and throughput with the change against the
+first. The database is the one the load test uses (seed it with
+``python -m benchmarks.load_test --seed``). Keep --clients high enough to
+saturate --workers, and watch the client's CPU as for the load test.
+
+    python -m benchmarks.bench_serve [--url URL] [--clients 32] [--duration 30] [--workers 1]
+"""
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+
+from benchmarks.load_test import ROOT, compare, drive, git_commit, start_app, stop_app
+
+CONFIGURATIONS = [("asyncio", "h11"), ("uvloop", "httptools")]
+
+
+def run(args, loop: str, http: str) -> dict:
+    args.loop, args.http = loop, http
+    process, base_url = start_app(args)
+    try:
+        results = asyncio.run(drive(base_url, args))
+    finally:
+        stop_app(process)
+    config = {"started_at": datetime.utcnow().isoformat(), "commit": git_commit(), "loop": loop, "http": http}
+    return {"config": config, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="sqlite:///" + os.path.join(ROOT, "load_test.db"))
+    parser.add_argument("--users", type=int, default=1000, help="seeded load users to log in as")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--think-ms", type=float, default=0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--sample", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    runs = {}
+    for loop, http in CONFIGURATIONS:
+        runs[f"{loop}+{http}"] = results = run(args, loop, http)
+        total = results["total"]
+        print(f"{loop} + {http}: {total['requests']} requests, {total['rps']:.1f} rps, failed: {total['failed']}")
+    baseline, *others = runs.values()
+    for results in others:
+        print(f"\n{results['config']['loop']} + {results['config']['http']}, "
+              f"against {baseline['config']['loop']} + {baseline['config']['http']}", end="")
+        compare(baseline, results)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(runs, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
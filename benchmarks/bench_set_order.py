@@ -0,0 +1,85 @@
+"""Round trips and latency of order creation against order size.
+
+Compares crud.set_order with the previous implementation (commit + refresh,
+then one SELECT per product id and a second commit).
+
+    python -m benchmarks.bench_set_order [--url URL] [--sizes 1 10 50 200]
+"""
+import argparse
+import json
+
+from benchmarks.common import DEFAULT_URL, QueryCounter, configure, make_engine, stopwatch, summarize
+
+
+def legacy_set_order(db, order_data):
+    import models
+
+    order_info = models.Order(
+        owner_id=order_data.user_id,
+        shipping_address=order_data.shipping_address,
+        payment_method=order_data.payment_method,
+    )
+    db.add(order_info)
+    db.commit()
+    db.refresh(order_info)
+    for product_id in order_data.product_ids:
+        product = db.query(models.Product).filter(models.Product.id == product_id).first()
+        if product:
+            db.add(models.OrderProduct(order_id=order_info.id, product_id=product_id))
+    db.commit()
+    return order_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    configure(args.url)
+    import uuid
+    from sqlalchemy.orm import sessionmaker
+    import crud, models, schemas
+    from enums import PaymentMethodEnum
+
+    engine = make_engine(args.url)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with Session() as db:
+        user = models.User(username=f"bench-{uuid.uuid4()}", email=f"{uuid.uuid4()}@bench.local")
+        products = [
+            models.Product(name=f"bench-{uuid.uuid4()}", price=1, brand="bench")
+            for _ in range(max(args.sizes))
+        ]
+        db.add(user)
+        db.add_all(products)
+        db.commit()
+        user_id = user.id
+        product_ids = [product.id for product in products]
+
+    results = []
+    for size in args.sizes:
+        order = schemas.OrderCreate(
+            user_id=user_id,
+            shipping_address="1 Bench Street",
+            payment_method=PaymentMethodEnum.CARD,
+            product_ids=product_ids[:size],
+        )
+        for name, implementation in (("legacy", legacy_set_order), ("current", crud.set_order)):
+            samples = []
+            round_trips = 0
+            for _ in range(args.repeat):
+                with Session() as db, QueryCounter(engine) as counter, stopwatch(samples):
+                    implementation(db, order)
+                round_trips = counter.round_trips
+            results.append({"implementation": name, "order_size": size,
+                            "round_trips": round_trips, **summarize(samples)})
+            print(f"{name:8} size={size:<5} round_trips={round_trips:<5} "
+                  f"p50={results[-1]['p50_ms']:.2f}ms p95={results[-1]['p95_ms']:.2f}ms")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""How long a new worker takes to become useful.
+
+Times, over --rounds fresh processes each:
+    import        ``import main`` in a new interpreter
+    first request from spawning ``uvicorn main:app`` to the first 200 of
+                  GET /products/?limit=1, which includes the startup
+                  events (revocation log, autocomplete index) and the
+                  first database connection
+
+It also checks that ``import main`` succeeds while the database cannot be
+reached. The database is a seeded SQLite file (benchmarks/seed.py, with
+--products) unless --url is given.
+
+    python -m benchmarks.bench_startup [--rounds 5] [--products 10000] [--url URL]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import configure, summarize
+from benchmarks.load_test import ROOT, free_port, stop_app
+
+IMPORT_SCRIPT = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+POLL_SECONDS = 0.005
+
+
+def app_env(url: str) -> dict:
+    env = {**os.environ, "DATABASE_URL": url}
+    env.setdefault("SECURITY_KEY", "benchmark-secret-key")
+    return env
+
+
+def time_import(url: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=app_env(url), capture_output=True, text=True, check=True
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def time_first_request(url: str) -> float:
+    import httpx
+
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=app_env(url),
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while True:
+                if process.poll() is not None:
+                    raise SystemExit(f"The app exited during startup with code {process.returncode}")
+                try:
+                    if client.get("/products/", params={"limit": 1}).status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(POLL_SECONDS)
+    finally:
+        stop_app(process)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench_startup.db")
+        configure(url)
+        import db, models, search  # search registers the SQLite FTS5 fallback with create_all
+        from benchmarks.seed import seed
+
+        models.Base.metadata.create_all(bind=db.engine)
+        seed(db.engine, 10, args.products, 0, 0)
+        db.dispose_engine()
+
+    imports = [time_import(url) for _ in range(args.rounds)]
+    first_requests = [time_first_request(url) for _ in range(args.rounds)]
+    try:
+        # A path SQLite cannot open stands in for a database that is down
+        time_import("sqlite:////nonexistent/bench_startup.db")
+        imports_with_database_down = True
+    except subprocess.CalledProcessError:
+        imports_with_database_down = False
+
+    results = {
+        "products": args.products if args.url is None else None,
+        "import": summarize(imports),
+        "first_request": summarize(first_requests),
+        "imports_with_database_down": imports_with_database_down,
+    }
+    print(f"import main:   p50 {results['import']['p50_ms']:.0f} ms")
+    print(f"first request: p50 {results['first_request']['p50_ms']:.0f} ms")
+    print(f"import with the database down: {'ok' if imports_with_database_down else 'FAILS'}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Fails when a crud query pattern has no supporting index.
+
+Builds a scratch SQLite database with ``alembic upgrade head``, so what gets
+checked is the migrations and not create_all. It seeds a few rows, runs every
+crud read/update/delete path once while recording the statements sent, and
+asks SQLite for each statement's plan. A full scan of a table is a failure.
+The check also fails when the models declare a table, column or index that
+the migrations do not create.
+
+    python -m benchmarks.check_indexes
+
+Exits non-zero on failure, so it can gate CI.
+"""
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from decimal import Decimal
+
+from benchmarks.common import configure
+
+# Schema drift that matters here; column types are not compared (on SQLite
+# they only differ by dialect).
+DRIFT_OPS = ("add_table", "remove_table", "add_column", "remove_column", "add_index", "remove_index")
+SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+
+
+def upgrade_head(url: str):
+    from alembic import command
+    from alembic.config import Config
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = Config(os.path.join(root, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(root, "alembic"))
+    command.upgrade(config, "head")
+
+
+def schema_drift(engine) -> list:
+    from alembic.autogenerate import compare_metadata
+    from alembic.migration import MigrationContext
+
+    import models, search
+
+    opts = {"compare_type": False, "include_name": search.include_name}
+    with engine.connect() as connection:
+        diffs = compare_metadata(MigrationContext.configure(connection, opts=opts), models.Base.metadata)
+    return [diff for diff in diffs if isinstance(diff, tuple) and diff[0] in DRIFT_OPS]
+
+
+class StatementRecorder:
+    """Collects (label, statement, parameters) for every non-insert statement
+    sent while ``label`` is set."""
+
+    def __init__(self):
+        self.label = None
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label is None or executemany:
+            return
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            self.statements.append((self.label, statement, parameters))
+
+
+def full_scans(engine, statement, parameters) -> list:
+    import models
+
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    scans = []
+    for row in plan:
+        match = SCAN.match(row[-1])
+        if match and match.group(1) in models.Base.metadata.tables and "USING" not in match.group(2):
+            scans.append(row[-1])
+    return scans
+
+
+def exercise(recorder: StatementRecorder):
+    import async_crud, async_db, authentication, crud, db, models, revocation, schemas
+    from enums import PaymentMethodEnum
+
+    session = db.SessionLocal()
+    user = models.User(username="check-user", email="check@example.com", hashed_password="x")
+    products = [models.Product(name=f"check-{i}", price=Decimal(i + 1), brand="check") for i in range(3)]
+    session.add(user)
+    session.add_all(products)
+    session.commit()
+    user_id, product_ids = user.id, [product.id for product in products]
+
+    order_data = schemas.OrderCreate(
+        user_id=user_id, product_ids=product_ids,
+        shipping_address="somewhere", payment_method=PaymentMethodEnum.CARD,
+    )
+    review_data = schemas.ReviewCreate(product_id=product_ids[1], review_content="fine")
+    state = {}
+
+    def page_cursor():
+        import pagination
+        return pagination.encode_cursor(products[0].created_at, product_ids[0])
+
+    def order_cursor():
+        import pagination
+        return pagination.encode_cursor(state["order"].created_at, state["order"].id)
+
+    def review_cursor():
+        import pagination
+        return pagination.encode_cursor(state["review"].created_at, state["review"].id)
+
+    async def import_products():
+        import async_crud, bulk_import
+        from enums import ExportFormatEnum
+
+        async def upload():
+            yield b'{"name": "check-0", "price": 2, "brand": "check"}\n{"name": "check-new", "price": 1, "brand": "check"}\n'
+
+        async with async_db.AsyncSessionLocal() as async_session:
+            await async_crud.import_products(async_session, bulk_import.chunks(upload(), ExportFormatEnum.NDJSON))
+
+    def imported_id():
+        from sqlalchemy import select
+        return session.scalar(select(models.Product.id).where(models.Product.name == "check-new"))
+
+    async def bulk_change(function, *args):
+        async with async_db.AsyncSessionLocal() as async_session:
+            await function(async_session, *args, batch_size=2)
+
+    async def refresh_revocations():
+        async with async_db.AsyncSessionLocal() as async_session:
+            # The full load runs once at startup and reads every live row anyway;
+            # only the periodic incremental refresh is checked.
+            recorder.label, revocation.revocations.since = None, None
+            await revocation.revocations.refresh(async_session)
+            recorder.label = "revocation.refresh"
+            await revocation.revocations.refresh(async_session)
+
+    calls = [
+        ("crud.get_user", lambda: crud.get_user(session, "check-user")),
+        ("authentication.get_user", lambda: authentication.get_user(session, "check-user")),
+        ("crud.update_user", lambda: crud.update_user(session, "check-user", schemas.UserUpdate(first_name="c"))),
+        ("crud.get_product", lambda: crud.get_product(session, product_ids[0])),
+        ("crud.get_products", lambda: crud.get_products(session, limit=2)),
+        ("crud.get_products cursor", lambda: crud.get_products(session, limit=2, cursor=page_cursor())),
+        ("crud.get_products brand", lambda: crud.get_products(session, limit=2, brand="check")),
+        ("crud.get_products price", lambda: crud.get_products(session, limit=2, price_min=1, price_max=2)),
+        ("crud.search_products", lambda: crud.search_products(session, "check", limit=2)),
+        ("crud.stream_products", lambda: list(crud.stream_products(session, batch_size=2))),
+        ("async_crud.import_products", lambda: asyncio.run(import_products())),
+        ("async_crud.bulk_update_products price", lambda: asyncio.run(bulk_change(
+            async_crud.bulk_update_products,
+            schemas.ProductBulkUpdate(filter=schemas.ProductFilter(price_min=1, price_max=2), price_change_percent=5),
+        ))),
+        ("async_crud.bulk_update_products brand", lambda: asyncio.run(bulk_change(
+            async_crud.bulk_update_products,
+            schemas.ProductBulkUpdate(filter=schemas.ProductFilter(brand="check"), brand="check"),
+        ))),
+        ("async_crud.bulk_delete_products", lambda: asyncio.run(bulk_change(
+            async_crud.bulk_delete_products, schemas.ProductFilter(ids=[imported_id()]),
+        ))),
+        ("crud.set_order", lambda: state.update(order=crud.set_order(session, order_data))),
+        ("crud.get_order", lambda: crud.get_order(session, state["order"].id)),
+        ("crud.get_order_detail", lambda: crud.get_order_detail(session, state["order"].id, user_id)),
+        ("crud.get_user_orders", lambda: crud.get_user_orders(session, user_id, limit=1)),
+        ("crud.get_user_orders cursor", lambda: crud.get_user_orders(
+            session, user_id, limit=1, cursor=order_cursor())),
+        ("crud.update_order", lambda: crud.update_order(session, state["order"].id, schemas.OrderUpdate(
+            shipping_address="elsewhere", payment_method=PaymentMethodEnum.STRIPE))),
+        ("crud.create_review", lambda: state.update(review=crud.create_review(session, review_data, user_id))),
+        ("crud.get_review", lambda: crud.get_review(session, state["review"].id)),
+        ("crud.get_review_version", lambda: crud.get_review_version(session, state["review"].id)),
+        ("crud.update_review", lambda: crud.update_review(session, state["review"].id, review_data)),
+        ("crud.get_product_reviews", lambda: crud.get_product_reviews(session, product_ids[1], limit=1)),
+        ("crud.get_product_reviews cursor", lambda: crud.get_product_reviews(
+            session, product_ids[1], limit=1, cursor=review_cursor())),
+        ("crud.delete_review", lambda: crud.delete_review(session, state["review"].id)),
+        ("crud.create_review", lambda: crud.create_review(session, review_data, user_id)),
+        ("crud.delete_order", lambda: crud.delete_order(
+            session, crud.set_order(session, order_data.model_copy(update={"product_ids": []})).id)),
+        ("crud.delete_product", lambda: crud.delete_product(session, product_ids[2])),
+        ("crud.delete_user_by_id", lambda: crud.delete_user_by_id(session, user_id)),
+        ("revocation.refresh", lambda: asyncio.run(refresh_revocations())),
+    ]
+    for label, call in calls:
+        recorder.label = label
+        call()
+        session.expire_all()
+    session.close()
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    url = "sqlite:///" + os.path.join(directory, "check_indexes.db")
+    configure(url)
+    upgrade_head(url)
+
+    from sqlalchemy import event
+
+    import async_db, db
+
+    failures = []
+    for diff in schema_drift(db.engine):
+        failures.append(f"schema drift: {diff[0]} {diff[1]!r}")
+
+    recorder = StatementRecorder()
+    event.listen(db.engine, "before_cursor_execute", recorder)
+    event.listen(async_db.async_engine.sync_engine, "before_cursor_execute", recorder)
+    exercise(recorder)
+    event.remove(db.engine, "before_cursor_execute", recorder)
+    event.remove(async_db.async_engine.sync_engine, "before_cursor_execute", recorder)
+
+    seen = set()
+    for label, statement, parameters in recorder.statements:
+        if (label, statement) in seen:
+            continue
+        seen.add((label, statement))
+        scans = full_scans(db.engine, statement, parameters)
+        print(f"{'FAIL' if scans else 'ok  '} {label}: {' '.join(statement.split())[:100]}")
+        for scan in scans:
+            failures.append(f"{label}: {scan}\n    {' '.join(statement.split())}")
+
+    if failures:
+        print(f"\n{len(failures)} problem(s):")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
+    print(f"\n{len(seen)} statement(s) checked, all index-backed")
+
+
+if __name__ == "__main__":
+    main()
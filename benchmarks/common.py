@@ -0,0 +1,93 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run from the repository root as modules, e.g.
+``python -m benchmarks.bench_set_order --url sqlite:///bench.db``.
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from typing import List
+
+DEFAULT_URL = "sqlite:///:memory:"
+
+
+def configure(url: str) -> None:
+    # Must run before the application modules are imported: db.py reads
+    # DATABASE_URL at import time.
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("SECURITY_KEY", "benchmark-secret-key")
+
+
+def make_engine(url: str):
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    import models
+
+    if url.startswith("sqlite"):
+        # A single shared connection so :memory: databases survive across sessions.
+        engine = create_engine(
+            url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    return engine
+
+
+class QueryCounter:
+    """Counts statements (one per cursor execute) and commits on an engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = 0
+        self.commits = 0
+
+    @property
+    def round_trips(self) -> int:
+        return self.statements + self.commits
+
+    def _on_execute(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        event.listen(self.engine, "commit", self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        event.remove(self.engine, "commit", self._on_commit)
+
+
+@contextmanager
+def stopwatch(samples: List[float]):
+    start = time.perf_counter()
+    yield
+    samples.append(time.perf_counter() - start)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> dict:
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
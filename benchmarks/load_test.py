@@ -0,0 +1,351 @@
+"""Mixed HTTP workload against a locally started app.
+
+Starts the app with serve.py on a free local port against --url (SQLite or
+PostgreSQL), optionally seeds it first (benchmarks/seed.py), and runs
+--clients concurrent virtual users for --duration seconds. Each user logs
+in once as one of the seeded load users and then loops over weighted
+actions:
+
+    browse  first page of GET /products/, sometimes the next one, a product,
+            its reviews, and a search or an autocomplete
+    login   POST /token
+    order   POST /orders/ with 1-3 products, then GET /users/me/orders
+    review  POST /reviews/, then GET /reviews/{review_id}
+
+Every request is recorded under its route, and reported with p50/p95/p99,
+mean latency, throughput, status codes and transport errors. Requests
+started during --warmup are left out. The results are written to --output
+as JSON, and --compare prints the change against an earlier run. Pass
+--base-url to drive an app that is already running instead.
+
+The load generator is a single Python process: watch its CPU. If it is at
+100%, the numbers describe the client, not the app.
+
+    python -m benchmarks.load_test --url sqlite:///load.db --seed --products 100000
+    python -m benchmarks.load_test --url postgresql://localhost/draftshop --clients 64 --workers 4 --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from benchmarks.bench_search import COLORS, ITEMS
+from benchmarks.common import configure, summarize
+from benchmarks.seed import LOAD_PASSWORD, row_id, username
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIX = {"browse": 70, "login": 5, "order": 15, "review": 10}
+PAGE_SIZE = 20
+STARTUP_TIMEOUT = 300
+
+
+class Recorder:
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.errors = defaultdict(Counter)
+        self.actions = defaultdict(list)
+
+    def request(self, label: str, started: float, status=None, error=None):
+        if started < self.measure_from:
+            return
+        self.samples[label].append(time.perf_counter() - started)
+        if error is None:
+            self.statuses[label][status] += 1
+        else:
+            self.errors[label][error] += 1
+
+    def action(self, name: str, started: float):
+        if started >= self.measure_from:
+            self.actions[name].append(time.perf_counter() - started)
+
+    def report(self, seconds: float) -> dict:
+        endpoints = {}
+        for label in sorted(self.samples):
+            samples = self.samples[label]
+            endpoints[label] = {
+                **summarize(samples),
+                "rps": len(samples) / seconds,
+                "statuses": {str(status): count for status, count in sorted(self.statuses[label].items())},
+                "errors": dict(self.errors[label]),
+            }
+        total = sum(len(samples) for samples in self.samples.values())
+        failed = sum(
+            count for label in self.samples
+            for status, count in self.statuses[label].items() if status >= 500
+        ) + sum(sum(errors.values()) for errors in self.errors.values())
+        return {
+            "seconds": seconds,
+            "total": {"requests": total, "rps": total / seconds, "failed": failed},
+            "endpoints": endpoints,
+            "actions": {name: summarize(samples) for name, samples in sorted(self.actions.items())},
+        }
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, index: int, users: int, product_ids: list):
+        self.client = client
+        self.recorder = recorder
+        self.rng = random.Random(index)
+        self.username = username(index % users)
+        self.product_ids = product_ids
+        self.headers = {}
+
+    async def call(self, method: str, label: str, url: str, **kwargs):
+        import httpx
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError as exc:
+            self.recorder.request(label, started, error=type(exc).__name__)
+            return None
+        self.recorder.request(label, started, status=response.status_code)
+        return response
+
+    def hot_product(self) -> str:
+        # The sample is the oldest products, which the seed made the most
+        # ordered and reviewed; skew towards its head as well.
+        return self.product_ids[int(len(self.product_ids) * self.rng.random() ** 2)]
+
+    async def login(self) -> bool:
+        response = await self.call(
+            "POST", "POST /token", "/token", data={"username": self.username, "password": LOAD_PASSWORD}
+        )
+        if response is None or response.status_code != 200:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def browse(self):
+        response = await self.call("GET", "GET /products/", "/products/", params={"limit": PAGE_SIZE})
+        if response is not None and response.status_code == 200 and self.rng.random() < 0.3:
+            cursor = response.json()["next_cursor"]
+            if cursor:
+                await self.call(
+                    "GET", "GET /products/ next page", "/products/", params={"limit": PAGE_SIZE, "cursor": cursor}
+                )
+        product_id = self.hot_product()
+        await self.call("GET", "GET /products/{id}", f"/products/{product_id}")
+        await self.call("GET", "GET /products/{id}/reviews", f"/products/{product_id}/reviews")
+        if self.rng.random() < 0.5:
+            q = f"{self.rng.choice(COLORS)} {self.rng.choice(ITEMS)}"
+            await self.call("GET", "GET /products/search", "/products/search", params={"q": q})
+        else:
+            q = self.rng.choice(COLORS)[: self.rng.randint(1, 4)]
+            await self.call("GET", "GET /products/autocomplete", "/products/autocomplete", params={"q": q})
+
+    async def order(self):
+        order = {
+            "user_id": "00000000-0000-0000-0000-000000000000",  # replaced by the caller's id
+            "product_ids": list({self.hot_product() for _ in range(self.rng.randint(1, 3))}),
+            "shipping_address": "1 Load Street",
+            "payment_method": "card",
+        }
+        await self.call("POST", "POST /orders/", "/orders/", json=order)
+        await self.call("GET", "GET /users/me/orders", "/users/me/orders")
+
+    async def review(self):
+        review = {"product_id": self.hot_product(), "review_content": f"Load test review {self.rng.random()}"}
+        response = await self.call("POST", "POST /reviews/", "/reviews/", json=review)
+        if response is not None and response.status_code == 200:
+            await self.call("GET", "GET /reviews/{review_id}", f"/reviews/{response.json()['id']}")
+
+    async def run(self, deadline: float, think: float):
+        # Many users logging in at once can fill the hash pool (503): retry
+        while not await self.login():
+            if time.perf_counter() >= deadline:
+                return
+            await asyncio.sleep(0.5 + self.rng.random())
+        actions = list(MIX)
+        weights = list(MIX.values())
+        while time.perf_counter() < deadline:
+            name = self.rng.choices(actions, weights)[0]
+            started = time.perf_counter()
+            await getattr(self, name)()
+            self.recorder.action(name, started)
+            if think:
+                await asyncio.sleep(self.rng.expovariate(1 / think))
+
+
+async def check_seeded(client, product_ids: list):
+    response = await client.get(f"/products/{product_ids[0]}")
+    if response.status_code == 404:
+        raise SystemExit("The catalog was not made by benchmarks.seed: run with --seed, or seed it first")
+    response.raise_for_status()
+
+
+async def drive(base_url: str, args) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        # The API does not list product ids: the seed's are derived from
+        # the row's index, the first ones being the oldest products.
+        product_ids = [str(row_id("product", i)) for i in range(args.sample)]
+        await check_seeded(client, product_ids)
+        started = time.perf_counter()
+        recorder = Recorder(started + args.warmup)
+        deadline = started + args.warmup + args.duration
+        users = [VirtualUser(client, recorder, i, args.users, product_ids) for i in range(args.clients)]
+        await asyncio.gather(*(user.run(deadline, args.think_ms / 1000) for user in users))
+        return recorder.report(time.perf_counter() - recorder.measure_from)
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_app(args):
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": args.url}
+    env.setdefault("SECURITY_KEY", "benchmark-secret-key")
+    process = subprocess.Popen(
+        [
+            sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers),
+            "--loop", args.loop, "--http", args.http, "--log-level", "warning",
+        ],
+        cwd=ROOT, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    wait_until_ready(process, base_url)
+    return process, base_url
+
+
+def wait_until_ready(process, base_url: str):
+    import httpx
+
+    # Startup builds the autocomplete index from the whole catalog
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"The app exited during startup with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/products/", params={"limit": 1}, timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f"The app was not ready after {STARTUP_TIMEOUT}s")
+
+
+def stop_app(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict):
+    def change(old, new):
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "    n/a"
+
+    print(f"\nagainst {previous['config'].get('commit')} ({previous['config'].get('started_at')}):")
+    print(f"{'endpoint':30} {'p95 ms before':>14} {'after':>9} {'':8} {'rps before':>11} {'after':>9} {'':8}")
+    for label, now in current["endpoints"].items():
+        before = previous["endpoints"].get(label)
+        if before is None:
+            print(f"{label:30} {'-':>14} {now['p95_ms']:9.1f} {'':8} {'-':>11} {now['rps']:9.1f}")
+            continue
+        print(
+            f"{label:30} {before['p95_ms']:14.1f} {now['p95_ms']:9.1f} {change(before['p95_ms'], now['p95_ms']):8}"
+            f" {before['rps']:11.1f} {now['rps']:9.1f} {change(before['rps'], now['rps']):8}"
+        )
+    before, now = previous["total"]["rps"], current["total"]["rps"]
+    print(f"{'total':30} {'':14} {'':9} {'':8} {before:11.1f} {now:9.1f} {change(before, now):8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="sqlite:///" + os.path.join(ROOT, "load_test.db"))
+    parser.add_argument("--base-url", default=None, help="an app that is already running; --url is then only used by --seed")
+    parser.add_argument("--seed", action="store_true", help="create the tables and seed --url before starting")
+    parser.add_argument("--users", type=int, default=1000, help="seeded load users to log in as")
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's actions")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--loop", choices=("auto", "uvloop", "asyncio"), default="auto")
+    parser.add_argument("--http", choices=("auto", "httptools", "h11"), default="auto")
+    parser.add_argument("--sample", type=int, default=1000, help="products picked from, the oldest of the catalog")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None)
+    args = parser.parse_args()
+
+    from sqlalchemy.engine import make_url
+
+    config = {
+        "started_at": datetime.utcnow().isoformat(),
+        "commit": git_commit(),
+        "dialect": make_url(args.url).get_backend_name() if args.base_url is None else None,
+        "base_url": args.base_url,
+        **{name: getattr(args, name) for name in ("clients", "duration", "warmup", "think_ms", "workers", "loop", "http", "users")},
+        "mix": MIX,
+    }
+    if args.seed:
+        from benchmarks.seed import seed
+
+        configure(args.url)
+        import db, models, search  # search registers the SQLite FTS5 fallback with create_all
+
+        models.Base.metadata.create_all(bind=db.engine)
+        config["seed"] = seed(db.engine, args.users, args.products, args.orders, args.reviews)
+        db.engine.dispose()
+
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_app(args)
+    try:
+        results = {"config": config, **asyncio.run(drive(base_url, args))}
+    finally:
+        if process is not None:
+            stop_app(process)
+
+    print(f"{'endpoint':30} {'n':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for label, stats in results["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in stats["statuses"].items())
+        errors = " ".join(f"{error}:{count}" for error, count in stats["errors"].items())
+        print(
+            f"{label:30} {stats['n']:7} {stats['rps']:8.1f} {stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f}"
+            f" {stats['p99_ms']:8.1f}  {statuses} {errors}"
+        )
+    total = results["total"]
+    print(f"{'total':30} {total['requests']:7} {total['rps']:8.1f}  failed: {total['failed']}")
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), results)
+
+
+if __name__ == "__main__":
+    main()
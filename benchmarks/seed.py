@@ -0,0 +1,170 @@
+"""Synthetic catalog for the load test and the other benchmarks.
+
+Inserts users, products, orders with their line items, and reviews with
+Core executemany batches, one transaction per batch. It then sets the
+products' denormalized review stats to match. Popularity is skewed: the
+oldest products get most of the orders and reviews. All users share
+LOAD_PASSWORD, hashed once, and are named loaduser0, loaduser1, ... Ids
+are derived from the row's index, so nothing is kept in memory per row
+and two runs with the same sizes produce the same data.
+
+    python -m benchmarks.seed --url URL [--users 1000] [--products 1000000] [--orders 20000] [--reviews 50000]
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.bench_search import BRANDS, COLORS, ITEMS, MATERIALS
+from benchmarks.common import configure
+
+LOAD_PASSWORD = "load-test-password"
+BATCH = 20000
+SPAN = timedelta(days=365)
+
+
+def username(index: int) -> str:
+    return f"loaduser{index}"
+
+
+def row_id(kind: str, index: int) -> uuid.UUID:
+    return uuid.UUID(bytes=hashlib.md5(f"{kind}{index}".encode()).digest(), version=4)
+
+
+def popular(rng: random.Random, count: int) -> int:
+    # Cubing a uniform draw puts about half the picks in the first eighth
+    return int(count * rng.random() ** 3)
+
+
+def batched(rows, size: int = BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert(engine, table, rows) -> int:
+    count = 0
+    for batch in batched(rows):
+        with engine.begin() as connection:
+            connection.execute(table.insert(), batch)
+        count += len(batch)
+    return count
+
+
+def seed(engine, users: int, products: int, orders: int, reviews: int, items_per_order: int = 3) -> dict:
+    import models, security
+
+    rng = random.Random(1)
+    start = datetime.utcnow() - SPAN
+    step = SPAN / max(products, 1)
+    hashed_password = security.get_password_hash(LOAD_PASSWORD)
+    timings = {}
+
+    def timed(name, table, rows):
+        started = time.perf_counter()
+        count = insert(engine, table, rows)
+        timings[name] = {"rows": count, "seconds": time.perf_counter() - started}
+
+    timed("users", models.User.__table__, (
+        {
+            "id": row_id("user", i), "username": username(i), "email": f"{username(i)}@example.com",
+            "hashed_password": hashed_password, "first_name": "Load", "last_name": f"User{i}",
+        }
+        for i in range(users)
+    ))
+
+    def product_rows():
+        for i in range(products):
+            created_at = start + step * i
+            yield {
+                "id": row_id("product", i),
+                "name": f"{rng.choice(COLORS)} {rng.choice(MATERIALS)} {rng.choice(ITEMS)} {i}",
+                "price": rng.randint(100, 50000) / 100,
+                "brand": f"brand{rng.randrange(BRANDS)}",
+                "created_at": created_at, "updated_at": created_at, "review_count": 0,
+            }
+
+    timed("products", models.Product.__table__, product_rows())
+
+    lines = []
+
+    def order_rows():
+        for i in range(orders):
+            created_at = start + SPAN * rng.random()
+            order_id = row_id("order", i)
+            picked = {popular(rng, products) for _ in range(rng.randint(1, 2 * items_per_order - 1))}
+            lines.extend({"order_id": order_id, "product_id": row_id("product", p)} for p in picked)
+            yield {
+                "id": order_id, "owner_id": row_id("user", rng.randrange(users)),
+                "created_at": created_at, "updated_at": created_at,
+                "shipping_address": f"{i} Load Street", "payment_method": "CARD",
+            }
+
+    if users and products:
+        timed("orders", models.Order.__table__, order_rows())
+        timed("order_lines", models.OrderProduct.__table__, lines)
+
+    stats = {}
+
+    def review_rows():
+        for i in range(reviews):
+            product = popular(rng, products)
+            created_at = start + SPAN * rng.random()
+            count, last = stats.get(product, (0, created_at))
+            stats[product] = (count + 1, max(last, created_at))
+            yield {
+                "id": row_id("review", i), "product_id": row_id("product", product),
+                "review_maker_id": row_id("user", rng.randrange(users)),
+                "review_content": f"Review {i}", "created_at": created_at, "updated_at": created_at,
+            }
+
+    if users and products:
+        timed("reviews", models.Review.__table__, review_rows())
+        started = time.perf_counter()
+        from sqlalchemy import bindparam, update
+
+        statement = (
+            update(models.Product.__table__)
+            .where(models.Product.__table__.c.id == bindparam("product_id"))
+            .values(review_count=bindparam("count"), last_review_at=bindparam("last"))
+        )
+        for batch in batched(
+            {"product_id": row_id("product", product), "count": count, "last": last}
+            for product, (count, last) in stats.items()
+        ):
+            with engine.begin() as connection:
+                connection.execute(statement, batch)
+        timings["review_stats"] = {"rows": len(stats), "seconds": time.perf_counter() - started}
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--reviews", type=int, default=50000)
+    args = parser.parse_args()
+
+    configure(args.url)
+    import db, models, search  # search registers the SQLite FTS5 fallback with create_all
+
+    models.Base.metadata.create_all(bind=db.engine)
+    timings = seed(db.engine, args.users, args.products, args.orders, args.reviews, args.items_per_order)
+    for name, timing in timings.items():
+        print(f"{name:13} {timing['rows']:>9} rows in {timing['seconds']:7.1f}s  {timing['rows'] / max(timing['seconds'], 1e-9):9.0f} rows/s")
+    print(json.dumps(timings, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import csv
+import math
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+
+import models
+import schemas
+from enums import ExportFormatEnum
+
+# Rows validated and written per transaction. A chunk that the database
+# rejects is reported row by row and the import carries on with the next one.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+# Every failed row is counted, only the first ones are listed in the response.
+IMPORT_MAX_ERRORS = 100
+
+_price = models.Product.price.type
+MAX_PRICE = 10 ** (_price.precision - _price.scale)
+
+
+class Chunk:
+    """Valid rows of one chunk (upload line, product) and the errors found in it."""
+
+    def __init__(self):
+        self.rows: List[Tuple[int, schemas.ProductAdd]] = []
+        self.errors: List[dict] = []
+
+    def __len__(self):
+        return len(self.rows) + len(self.errors)
+
+
+def row_error(line: int, *messages: str) -> dict:
+    return {"line": line, "errors": list(messages)}
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    # Splitting on b"\n" never cuts a UTF-8 sequence in two, so lines are
+    # decoded one at a time without buffering the whole upload.
+    pending = bytearray()
+    number = 0
+    async for data in stream:
+        pending += data
+        end = pending.rfind(b"\n")
+        if end < 0:
+            continue
+        lines = pending[:end].split(b"\n")
+        del pending[:end + 1]
+        for line in lines:
+            number += 1
+            yield number, line.decode("utf-8", errors="replace").rstrip("\r")
+    if pending:
+        yield number + 1, pending.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def iter_ndjson(stream) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    async for number, line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            yield number, orjson.loads(line), None
+        except orjson.JSONDecodeError:
+            yield number, None, "not valid JSON"
+
+
+async def iter_csv(stream) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    # The first record is the header; columns other than those of
+    # ProductAdd are ignored, so a file from GET /products/export?format=csv
+    # imports as is. A quoted field may span lines: a record is complete once
+    # it holds an even number of quote characters.
+    header = None
+    record, first_line = "", 0
+    async for number, line in iter_lines(stream):
+        if not record:
+            if not line.strip():
+                continue
+            first_line = number
+            record = line
+        else:
+            record += "\n" + line
+        if record.count('"') % 2:
+            continue
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error as exc:
+            values, error = None, f"not valid CSV: {exc}"
+        record = ""
+        if header is None:
+            header = values or []
+            continue
+        if values is None:
+            yield first_line, None, error
+        else:
+            yield first_line, dict(zip(header, values)), None
+    if record:
+        yield first_line, None, "not valid CSV: unterminated quoted field"
+
+
+def validate(data) -> Tuple[Optional[schemas.ProductAdd], List[str]]:
+    try:
+        product = schemas.ProductAdd.model_validate(data)
+    except ValidationError as exc:
+        return None, [
+            ".".join(str(part) for part in error["loc"]) + ": " + error["msg"] if error["loc"] else error["msg"]
+            for error in exc.errors(include_url=False)
+        ]
+    if not math.isfinite(product.price) or abs(product.price) >= MAX_PRICE:
+        return None, [f"price: must be a number below {MAX_PRICE}"]
+    return product, []
+
+
+async def chunks(stream, format: ExportFormatEnum, size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[Chunk]:
+    records = iter_csv(stream) if format == ExportFormatEnum.CSV else iter_ndjson(stream)
+    chunk = Chunk()
+    async for line, data, error in records:
+        if error is None:
+            product, errors = validate(data)
+            if product is not None:
+                chunk.rows.append((line, product))
+            else:
+                chunk.errors.append(row_error(line, *errors))
+        else:
+            chunk.errors.append(row_error(line, error))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = Chunk()
+    if len(chunk):
+        yield chunk
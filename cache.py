@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "10000"))
+PRODUCT_CACHE_TTL = float(os.getenv("PRODUCT_CACHE_TTL", "60"))
+
+
+class CacheBackend(ABC):
+    """Interface of a cache tier. A shared backend (e.g. Redis) implements
+    these three methods and handles serialization of the stored dicts."""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any):
+        ...
+
+    @abstractmethod
+    def delete(self, key: Hashable):
+        ...
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU with a per-entry TTL and a size bound."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Sync endpoints use the cache from threadpool threads.
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class ReadThroughCache:
+    """Local LRU in front of an optional shared backend.
+
+    Writers call ``invalidate`` (or ``put`` with fresh data) after their
+    commit. A reader that loaded a row while an invalidation happened does not
+    store it, so a stale row cannot overwrite a newer invalidation. With read
+    replicas, a key also refuses loaded values for ``quarantine`` seconds after
+    its invalidation, since a lagging replica can still return the old row.
+    """
+
+    def __init__(self, local: LRUCache, shared: Optional[CacheBackend] = None, quarantine: float = 0.0):
+        self.local = local
+        self.shared = shared
+        self.quarantine = quarantine
+        self.generation = 0
+        # Oldest invalidation first; entries past the quarantine are pruned on
+        # every invalidate, so keys that are never read again do not pile up.
+        self._invalidated_at: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def put(self, key, value, generation: Optional[int] = None):
+        if generation is not None:
+            if generation != self.generation:
+                return
+            with self._lock:
+                invalidated_at = self._invalidated_at.get(key)
+                if invalidated_at is not None:
+                    if time.monotonic() - invalidated_at < self.quarantine:
+                        return
+                    del self._invalidated_at[key]
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def invalidate(self, key):
+        self.generation += 1
+        if self.quarantine:
+            now = time.monotonic()
+            with self._lock:
+                self._invalidated_at.pop(key, None)
+                self._invalidated_at[key] = now
+                while next(iter(self._invalidated_at.values())) <= now - self.quarantine:
+                    self._invalidated_at.popitem(last=False)
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.local.stats(), "shared": type(self.shared).__name__ if self.shared else None}
+
+
+# Columns kept per product; snapshots are plain dicts, never session-bound ORM objects.
+PRODUCT_FIELDS = ("id", "name", "price", "brand", "created_at", "updated_at", "review_count", "last_review_at")
+
+def product_snapshot(product) -> dict:
+    return {field: getattr(product, field) for field in PRODUCT_FIELDS}
+
+
+products = ReadThroughCache(LRUCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL))
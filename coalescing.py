@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", "5"))
+
+
+class CoalescingTimeout(Exception):
+    def __init__(self, key: Hashable):
+        super().__init__(f"Timed out waiting for {key!r}")
+        self.key = key
+
+
+class AsyncSingleFlight:
+    """Concurrent callers with the same key share one in-flight coroutine.
+
+    The first caller starts ``fn()`` as a task; later callers await the same
+    task until it finishes. Its result or exception is handed to every
+    caller. Each caller waits at most ``timeout`` seconds. The shared task
+    keeps running for the others even if one caller gives up.
+    """
+
+    def __init__(self, default_timeout: float = COALESCE_TIMEOUT):
+        self.default_timeout = default_timeout
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def _done(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here so an unawaited failure is not logged
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._done(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout or self.default_timeout)
+        except asyncio.TimeoutError:
+            raise CoalescingTimeout(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Thread-based counterpart of AsyncSingleFlight for sync endpoints.
+
+    The first thread runs ``fn()`` itself; the others block until it is done,
+    for at most ``timeout`` seconds.
+    """
+
+    def __init__(self, default_timeout: float = COALESCE_TIMEOUT):
+        self.default_timeout = default_timeout
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                call.done.set()
+        elif not call.done.wait(timeout or self.default_timeout):
+            raise CoalescingTimeout(key)
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+# Shared by the async endpoints (event loop) and the sync ones (threadpool).
+reads = AsyncSingleFlight()
+sync_reads = SingleFlight()
@@ -1,10 +1,20 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import column, func, insert, select, table, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
 import models
 import schemas
+import revocation
+import cache
+import autocomplete
+import coalescing
+from db import in_own_session
+import pagination
+import search
 import bcrypt
 import uuid
 from datetime import datetime
-from typing import List
+from decimal import Decimal
+from typing import List, Optional
 
 # User CRUD functions
 
@@ -33,6 +43,7 @@ def delete_user_by_id(db: Session, user_id: uuid.UUID):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
         db.delete(user)
+        revocation.revoke(db, user_id=user.id)
         db.commit()
         return True
     return False
@@ -43,6 +54,8 @@ def update_user(db: Session, username: str, user_update: schemas.UserUpdate):
         for attr, value in vars(user_update).items():
             if value is not None:
                 setattr(db_user, attr, value)
+        # Tokens carry the user's claims, so the ones issued before this change are revoked
+        revocation.revoke(db, user_id=db_user.id)
         db.commit()
         db.refresh(db_user)
         return db_user
@@ -53,48 +66,334 @@ def update_user(db: Session, username: str, user_update: schemas.UserUpdate):
 def get_product(db: Session, id: uuid.UUID):
     return db.query(models.Product).filter(models.Product.id == id).first()
 
-def get_products(db: Session):
-    return db.query(models.Product).all()
+def load_product_snapshot(db: Session, id: uuid.UUID):
+    generation = cache.products.generation
+    product = get_product(db, id=id)
+    if product is None:
+        return None
+    snapshot = cache.product_snapshot(product)
+    cache.products.put(id, snapshot, generation)
+    return snapshot
+
+def get_product_cached(db: Session, id: uuid.UUID):
+    # Read-through: a snapshot dict from cache.products. Concurrent misses for
+    # the same id share one query, run on a session of its own.
+    snapshot = cache.products.get(id)
+    if snapshot is None:
+        snapshot = coalescing.sync_reads.do(
+            ("product", id, db.bind), lambda: in_own_session(db.bind, load_product_snapshot, id)
+        )
+    return snapshot
+
+def filter_products(
+    statement, brand: Optional[str] = None, price_min: Optional[float] = None, price_max: Optional[float] = None
+):
+    if brand is not None:
+        statement = statement.where(models.Product.brand == brand)
+    if price_min is not None:
+        statement = statement.where(models.Product.price >= price_min)
+    if price_max is not None:
+        statement = statement.where(models.Product.price <= price_max)
+    return statement
+
+# Just enough of each row to build a page's ETag and next cursor.
+PRODUCT_VERSION_COLUMNS = (models.Product.id, models.Product.created_at, models.Product.updated_at)
+
+def products_page_statement(
+    limit: int,
+    cursor: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    columns=(models.Product,),
+):
+    # Keyset pagination on (created_at, id): every page is an index range scan
+    # starting after the last row of the previous page, whatever the depth.
+    # One extra row is fetched to know whether there is a next page.
+    statement = filter_products(select(*columns), brand, price_min, price_max)
+    if cursor is not None:
+        created_at, last_id = pagination.decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(models.Product.created_at, models.Product.id) > tuple_(created_at, last_id)
+        )
+    return statement.order_by(models.Product.created_at, models.Product.id).limit(limit + 1)
+
+def split_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+def get_products(
+    db: Session,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    brand: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+):
+    statement = products_page_statement(limit, cursor, brand, price_min, price_max)
+    return split_page(db.scalars(statement).all(), limit)
+
+# Column order of the catalog export; rows are plain tuples in this order.
+PRODUCT_EXPORT_COLUMNS = ("id", "name", "price", "brand", "created_at", "updated_at")
+
+def stream_products(db: Session, batch_size: int = 1000):
+    # yield_per turns on stream_results, so the driver uses a server-side
+    # cursor and only one batch of row tuples is held in memory at a time.
+    columns = [getattr(models.Product, name) for name in PRODUCT_EXPORT_COLUMNS]
+    result = db.execute(
+        select(*columns)
+        .order_by(models.Product.created_at, models.Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        yield partition
+
+def search_products(db: Session, q: str, limit: int = 50, cursor: Optional[str] = None):
+    # Ranked full-text match on name and brand; see search.py for the indexes.
+    terms = search.terms_of(q)
+    if not terms:
+        return [], None
+    statement = search.search_statement(db.bind.dialect.name, terms, limit, cursor)
+    return search.split_page(db.execute(statement).all(), limit)
 
 def add_product(db: Session, product: schemas.ProductAdd):
     db_product = models.Product(name=product.name, price=product.price, brand=product.brand)
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    cache.products.put(db_product.id, cache.product_snapshot(db_product))
+    autocomplete.products.add_product(db_product.name, db_product.brand)
     return db_product
 
 def delete_product(db: Session, id: uuid.UUID):
     db_product = db.query(models.Product).filter(models.Product.id == id).first()
     if db_product:
+        name, brand = db_product.name, db_product.brand
         db.delete(db_product)
         db.commit()
+        cache.products.invalidate(id)
+        autocomplete.products.discard_product(name, brand)
         return db_product
 
+# Bulk import (POST /products/import): rows are upserted on the unique name,
+# a chunk per statement; async_crud.import_products drives it.
+PRODUCT_IMPORT_COLUMNS = ("id", "name", "price", "brand", "created_at", "updated_at")
+PRODUCT_IMPORT_STAGING = "products_import"
+
+def import_rows(products: List[schemas.ProductAdd]) -> List[dict]:
+    # One upsert cannot change the same row twice, so the last of several
+    # rows with the same name wins.
+    now = datetime.utcnow()
+    rows = {}
+    for product in products:
+        rows[product.name] = dict(
+            id=uuid.uuid4(), name=product.name, price=product.price, brand=product.brand,
+            created_at=now, updated_at=now,
+        )
+    return list(rows.values())
+
+def existing_products_statement(names: List[str]):
+    return select(models.Product.id, models.Product.name, models.Product.brand).where(models.Product.name.in_(names))
+
+def product_staging_table():
+    # Postgres: a temp table the chunk is COPY'd into, dropped at commit
+    return table(PRODUCT_IMPORT_STAGING, *(column(name) for name in PRODUCT_IMPORT_COLUMNS))
+
+PRODUCT_STAGING_DDL = f"""CREATE TEMP TABLE {PRODUCT_IMPORT_STAGING} (
+    id uuid, name varchar, price numeric(10, 2), brand varchar, created_at timestamp, updated_at timestamp
+) ON COMMIT DROP"""
+
+def product_upsert_statement(dialect: str, from_staging: bool = False):
+    # An existing product keeps its id and created_at; only the imported
+    # fields and updated_at change.
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = dialect_insert(models.Product.__table__)
+    if from_staging:
+        statement = statement.from_select(PRODUCT_IMPORT_COLUMNS, select(product_staging_table()))
+    return statement.on_conflict_do_update(
+        index_elements=[models.Product.name],
+        set_={
+            "price": statement.excluded.price,
+            "brand": statement.excluded.brand,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+
+def apply_import(rows: List[dict], existing) -> int:
+    # After the chunk's commit: cached snapshots of the updated products are
+    # dropped and the autocomplete index follows brand changes. Returns how
+    # many rows were new products.
+    brands = {name: brand for _, name, brand in existing}
+    for id, _, _ in existing:
+        cache.products.invalidate(id)
+    autocomplete.products.update_products(
+        [(row["name"], row["brand"]) for row in rows],
+        [(row["name"], brands[row["name"]]) for row in rows if row["name"] in brands],
+    )
+    return len(rows) - len(brands)
+
+# Bulk changes (POST /products/bulk-update and /products/bulk-delete): the
+# ids matching the selection are read a batch at a time, by keyset on id, and
+# each batch is changed in its own transaction with one set-based statement
+# that applies the filter again, so a product that stopped matching in
+# between is left alone. async_crud drives them.
+
+def bulk_selection_statement(selection: schemas.ProductFilter, columns=None):
+    statement = filter_products(
+        select(*(columns or (models.Product.id,))), selection.brand, selection.price_min, selection.price_max
+    )
+    if selection.ids is not None:
+        statement = statement.where(models.Product.id.in_(selection.ids))
+    return statement
+
+def bulk_batch_update(selection: schemas.ProductFilter, ids: List[uuid.UUID]):
+    statement = update(models.Product).where(models.Product.id.in_(ids))
+    return filter_products(statement, selection.brand, selection.price_min, selection.price_max)
+
+def bulk_page_statement(statement, after: Optional[uuid.UUID], batch_size: int):
+    # The next batch of ids after the last one changed: however many products
+    # match, one batch of ids is in memory at a time.
+    if after is not None:
+        statement = statement.where(models.Product.id > after)
+    return statement.order_by(models.Product.id).limit(batch_size)
+
+def bulk_update_values(change: schemas.ProductBulkUpdate) -> dict:
+    values = {"updated_at": datetime.utcnow()}
+    if change.price is not None:
+        values["price"] = change.price
+    elif change.price_change_percent is not None:
+        factor = Decimal(str(change.price_change_percent)) / 100 + 1
+        values["price"] = func.round(models.Product.price * factor, 2)
+    if change.brand is not None:
+        values["brand"] = change.brand
+    return values
+
+def products_on_orders():
+    # Order lines keep pointing at their products, so those are not deleted
+    return select(models.OrderProduct.product_id).where(models.OrderProduct.product_id == models.Product.id).exists()
+
+def apply_bulk_change(ids, added=(), discarded=()):
+    # After a batch's commit: cached snapshots are dropped, and the
+    # autocomplete index follows the (name, brand) pairs that came and went.
+    for id in ids:
+        cache.products.invalidate(id)
+    if added or discarded:
+        autocomplete.products.update_products(list(added), list(discarded))
+
 # Order CRUD functions
 
 def get_order(db: Session, order_id: uuid.UUID):
     return db.query(models.Order).filter(models.Order.id == order_id).first()
 
-def set_order(db: Session, order_data: schemas.OrderCreate):
-    order_info = models.Order(
+class UnknownProductsError(ValueError):
+    def __init__(self, product_ids: List[uuid.UUID]):
+        super().__init__("Unknown product ids")
+        self.product_ids = product_ids
+
+def new_order_row(order_data: schemas.OrderCreate) -> dict:
+    now = datetime.utcnow()
+    return dict(
+        id=uuid.uuid4(),
+        created_at=now,
+        updated_at=now,
         owner_id=order_data.user_id,
         shipping_address=order_data.shipping_address,
-        payment_method=order_data.payment_method
+        payment_method=order_data.payment_method,
     )
-    db.add(order_info)
-    db.commit()
-    
-    db.refresh(order_info)
-    
-    for product_id in order_data.product_ids:
-        product = db.query(models.Product).filter(models.Product.id == product_id).first()
-        if product:
-            order_product = models.OrderProduct(order_id=order_info.id, product_id=product_id)
-            db.add(order_product)
 
+def set_order(db: Session, order_data: schemas.OrderCreate):
+    # One IN query validates every product, then the order and its line items
+    # go out as two INSERTs (the second an executemany) in a single transaction.
+    product_ids = list(dict.fromkeys(order_data.product_ids))
+    found = set(db.scalars(select(models.Product.id).where(models.Product.id.in_(product_ids))))
+    unknown = [product_id for product_id in product_ids if product_id not in found]
+    if unknown:
+        raise UnknownProductsError(unknown)
+
+    order_row = new_order_row(order_data)
+    db.execute(insert(models.Order).values(**order_row))
+    if product_ids:
+        db.execute(
+            insert(models.OrderProduct),
+            [{"order_id": order_row["id"], "product_id": product_id} for product_id in product_ids],
+        )
     db.commit()
-    
-    return order_info
+
+    # Built from the inserted values, so rendering it needs no refresh query.
+    return models.Order(**order_row)
+
+def order_total_column():
+    # Summed by the database, as a correlated subquery on each order row
+    return (
+        select(func.coalesce(func.sum(models.Product.price), 0))
+        .join(models.OrderProduct, models.OrderProduct.product_id == models.Product.id)
+        .where(models.OrderProduct.order_id == models.Order.id)
+        .correlate(models.Order)
+        .scalar_subquery()
+        .label("total")
+    )
+
+# Line items and their products in one extra query for a whole page of
+# orders, instead of one lazy load per order and per item.
+ORDER_LINES = selectinload(models.Order.order_products).joinedload(models.OrderProduct.product)
+
+def order_detail_statement(order_id: uuid.UUID, owner_id: uuid.UUID):
+    return (
+        select(models.Order, order_total_column())
+        .where(models.Order.id == order_id, models.Order.owner_id == owner_id)
+        .options(ORDER_LINES)
+    )
+
+def user_orders_statement(owner_id: uuid.UUID, limit: int, cursor: Optional[str] = None):
+    # Newest first, keyset on (created_at, id)
+    statement = select(models.Order, order_total_column()).where(models.Order.owner_id == owner_id)
+    if cursor is not None:
+        created_at, last_id = pagination.decode_cursor(cursor)
+        statement = statement.where(tuple_(models.Order.created_at, models.Order.id) < tuple_(created_at, last_id))
+    return (
+        statement.options(ORDER_LINES)
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc())
+        .limit(limit + 1)
+    )
+
+def order_view(order: models.Order, total) -> dict:
+    # Same shape as schemas.OrderDetail
+    items = []
+    for line in order.order_products:
+        product = line.product
+        items.append({
+            "product_id": line.product_id,
+            "name": product.name if product is not None else None,
+            "price": product.price if product is not None else None,
+            "brand": product.brand if product is not None else None,
+        })
+    return {
+        "id": order.id,
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "shipping_address": order.shipping_address,
+        "payment_method": order.payment_method,
+        "items": items,
+        "total": total,
+    }
+
+def split_order_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].Order
+        next_cursor = pagination.encode_cursor(last.created_at, last.id)
+    return [order_view(order, total) for order, total in rows], next_cursor
+
+def get_order_detail(db: Session, order_id: uuid.UUID, owner_id: uuid.UUID):
+    row = db.execute(order_detail_statement(order_id, owner_id)).first()
+    return order_view(*row) if row is not None else None
+
+def get_user_orders(db: Session, owner_id: uuid.UUID, limit: int = 50, cursor: Optional[str] = None):
+    return split_order_page(db.execute(user_orders_statement(owner_id, limit, cursor)).all(), limit)
 
 def delete_order(db: Session, order_id: uuid.UUID):
     order = db.query(models.Order).filter(models.Order.id == order_id).first()
@@ -116,28 +415,83 @@ def update_order(db: Session, order_id: uuid.UUID, order_update: schemas.OrderUp
     return None
 
 # Review CRUD
+
+def review_stats_statement(product_id: uuid.UUID, delta: int):
+    # Keeps products.review_count / last_review_at in step, in the transaction
+    # that adds or removes the review (run after it is flushed). The count is
+    # an in-place increment, so concurrent writers never lose one; the latest
+    # timestamp is a single probe of ix_reviews_product_id_created_at_id.
+    latest = (
+        select(func.max(models.Review.created_at))
+        .where(models.Review.product_id == product_id)
+        .scalar_subquery()
+    )
+    return (
+        update(models.Product)
+        .where(models.Product.id == product_id)
+        .values(review_count=models.Product.review_count + delta, last_review_at=latest)
+        .execution_options(synchronize_session=False)
+    )
+
 def create_review(db: Session, review: schemas.ReviewCreate, user_id: uuid.UUID):
     db_review = models.Review(**review.dict(), review_maker_id=user_id)
     db.add(db_review)
+    db.flush()
+    db.execute(review_stats_statement(review.product_id, 1))
     db.commit()
+    cache.products.invalidate(review.product_id)
     db.refresh(db_review)
     return db_review
 
+def product_reviews_statement(product_id: uuid.UUID, limit: int, cursor: Optional[str] = None):
+    # Newest first, keyset on (created_at, id) like GET /products/
+    statement = select(models.Review).where(models.Review.product_id == product_id)
+    if cursor is not None:
+        created_at, last_id = pagination.decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(models.Review.created_at, models.Review.id) < tuple_(created_at, last_id)
+        )
+    return statement.order_by(models.Review.created_at.desc(), models.Review.id.desc()).limit(limit + 1)
+
+def get_product_reviews(db: Session, product_id: uuid.UUID, limit: int = 50, cursor: Optional[str] = None):
+    return split_page(db.scalars(product_reviews_statement(product_id, limit, cursor)).all(), limit)
+
 def get_review(db: Session, review_id: uuid.UUID):
     return db.query(models.Review).filter(models.Review.id == review_id).first()
 
+def get_review_version(db: Session, review_id: uuid.UUID):
+    # updated_at only, for answering conditional requests without the full row
+    return db.scalar(select(models.Review.updated_at).where(models.Review.id == review_id))
+
 def update_review(db: Session, review_id: uuid.UUID, review: schemas.ReviewUpdate):
     db_review = db.query(models.Review).filter(models.Review.id == review_id).first()
     if db_review:
+        old_product_id = db_review.product_id
         for key, value in review.dict().items():
             setattr(db_review, key, value)
+        # Read before the commit: after it, db_review is expired and reading
+        # it would load the row a second time, ahead of the refresh
+        new_product_id = db_review.product_id
+        if new_product_id != old_product_id:
+            # Moved to another product: both products' stats change
+            db.flush()
+            for product_id, delta in ((old_product_id, -1), (new_product_id, 1)):
+                if product_id is not None:
+                    db.execute(review_stats_statement(product_id, delta))
         db.commit()
+        cache.products.invalidate(old_product_id)
+        cache.products.invalidate(new_product_id)
         db.refresh(db_review)
     return db_review
 
 def delete_review(db: Session, review_id: uuid.UUID):
     db_review = db.query(models.Review).filter(models.Review.id == review_id).first()
     if db_review:
+        product_id = db_review.product_id
         db.delete(db_review)
+        db.flush()
+        if product_id is not None:
+            db.execute(review_stats_statement(product_id, -1))
         db.commit()
+        cache.products.invalidate(product_id)
     return db_review
\ No newline at end of file
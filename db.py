@@ -1,8 +1,11 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import  load_dotenv
+from sqlalchemy.pool import QueuePool
 import os
+import threading
+import pool_metrics
+import slow_queries
 #import psycopg2
 
 """connection = psycopg2.connect(
@@ -13,12 +16,94 @@ import os
     password="1234",
     options="-c client_encoding=latin-1"
 )"""
-load_dotenv()
-
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, connect_args={"options": "-c client_encoding=latin-1"})
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def connect_args_for(url: str) -> dict:
+    # libpq options only make sense for Postgres; SQLite is used for local tests.
+    if url.startswith("postgresql"):
+        return {"options": "-c client_encoding=latin-1"}
+    if url.startswith("sqlite"):
+        return {"check_same_thread": False}
+    return {}
+
+# Pool settings; the defaults match SQLAlchemy's except pre-ping, which is on
+# so connections killed by a Postgres failover are replaced transparently.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+DB_POOL_USE_LIFO = os.getenv("DB_POOL_USE_LIFO", "0") == "1"
+
+def pool_options_for(url: str, name: str, pool_class=QueuePool) -> dict:
+    # SQLite keeps SQLAlchemy's own pool choice (a :memory: database cannot
+    # be spread over a QueuePool), so only server databases get these.
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": pool_metrics.instrumented(pool_class, pool_metrics.stats_for(name)),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_use_lifo": DB_POOL_USE_LIFO,
+    }
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine():
+    # Created on first use rather than at import: importing the app needs no
+    # database, and each worker process builds its own pool once it runs.
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    DATABASE_URL, connect_args=connect_args_for(DATABASE_URL), **pool_options_for(DATABASE_URL, "primary")
+                )
+                pool_metrics.listen(engine, "primary")
+                slow_queries.listen(engine, "primary")
+                _engine = engine
+    return _engine
+
+def dispose_engine():
+    # Closes the pool; the next get_engine() starts a new one
+    global _engine
+    engine, _engine = _engine, None
+    if engine is not None:
+        engine.dispose()
+
+def _forget_engine_after_fork():
+    # Only matters under a server that forks after the app made its engine
+    # (e.g. a preloading process manager): the child must not touch the
+    # parent's pooled connections, so it drops them unclosed and builds its own.
+    global _engine, _engine_lock
+    _engine_lock = threading.Lock()
+    if _engine is not None:
+        _engine.dispose(close=False)
+        _engine = None
+
+os.register_at_fork(after_in_child=_forget_engine_after_fork)
+
+def __getattr__(name):
+    # db.engine keeps working for scripts, and creates the engine on first access
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+def SessionLocal(bind=None):
+    return _session_factory(bind=bind or get_engine())
+
+def in_own_session(bind, fn, *args, **kwargs):
+    # For coalesced reads: the shared call also serves other requests, so it
+    # must not run on (or return objects tied to) the session of the request
+    # that happened to start it, which closes when that request ends.
+    with SessionLocal(bind=bind) as db:
+        return fn(db, *args, **kwargs)
 
 Base = declarative_base()
 
@@ -27,4 +112,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,5 +1,11 @@
 from enum import Enum
 
+
 class PaymentMethodEnum(str, Enum):
     STRIPE = "stripe"
-    CARD = "card"
\ No newline at end of file
+    CARD = "card"
+
+
+class ExportFormatEnum(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
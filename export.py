@@ -0,0 +1,34 @@
+import csv
+import io
+from decimal import Decimal
+from typing import Iterable, Iterator, Sequence
+
+import orjson
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def iter_ndjson(columns: Sequence[str], batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    # One chunk per batch keeps the per-row cost to a single orjson call.
+    for rows in batches:
+        yield b"".join(
+            orjson.dumps(dict(zip(columns, row)), default=_default, option=orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def iter_csv(columns: Sequence[str], batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,70 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import security
+
+# bcrypt releases the GIL, so threads are enough; "process" is there for hash
+# schemes that do not.
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread")
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1)))
+# Hashes allowed to wait for a worker before new ones are refused.
+HASH_POOL_QUEUE_LIMIT = int(os.getenv("HASH_POOL_QUEUE_LIMIT", str(4 * HASH_POOL_WORKERS)))
+
+
+class HashPoolSaturated(RuntimeError):
+    pass
+
+
+class BoundedHashPool:
+    """Runs password hashing off the event loop on a bounded executor.
+
+    At most ``workers + queue_limit`` jobs are in flight; past that, callers
+    get ``HashPoolSaturated`` immediately instead of queueing behind a login
+    storm. The counter is only touched from the event loop, so it needs no lock.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, kind: str = "thread"):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.kind = kind
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash")
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HashPoolSaturated("Password hashing pool is saturated")
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pool = BoundedHashPool(HASH_POOL_WORKERS, HASH_POOL_QUEUE_LIMIT, HASH_POOL_KIND)
+
+
+async def hash_password(password: str) -> str:
+    return await pool.run(security.get_password_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # Returns (valid, new_hash); new_hash is set when the stored hash uses
+    # outdated settings and should be replaced.
+    return await pool.run(security.verify_and_update_password, password, hashed_password)
@@ -1,80 +1,150 @@
+import asyncio
 from datetime import timedelta
-from typing import List
+from typing import Optional
 import uuid
-import uvicorn
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+# Once, before the app modules: they read their settings from the environment at import
+load_dotenv()
+
 import authentication, security
+import hashing
+import revocation
 from authentication import get_current_user
 import models
 import schemas
 import crud
-from db import get_db , engine
-
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+import async_crud
+import cache
+import autocomplete
+import coalescing
+import conditional
+import serialization
+import pool_metrics
+import request_metrics
+import slow_queries
+import export
+import bulk_import
+import pagination
+import routing
+from db import get_db, SessionLocal, dispose_engine, in_own_session
+from async_db import get_async_db, AsyncSessionLocal, dispose_async_engine, in_own_async_session
+from enums import ExportFormatEnum
+
+PRODUCTS_PAGE_DEFAULT = 50
+PRODUCTS_PAGE_MAX = 200
+EXPORT_BATCH_SIZE = 1000
+BULK_BATCH_SIZE = 1000
+BULK_MAX_IDS = 10000
+ORDERS_PAGE_DEFAULT = 20
+ORDERS_PAGE_MAX = 100
+
+# One router per area; create_app() mounts them
+user_router = APIRouter(tags=["User"])
+product_router = APIRouter(tags=["Product"])
+order_router = APIRouter(tags=["Order"])
+review_router = APIRouter(tags=["Review"])
+# Operator-only: every /internal endpoint needs the INTERNAL_API_TOKEN header
+internal_router = APIRouter(include_in_schema=False, dependencies=[Depends(authentication.require_internal_token)])
+
+
+async def hash_pool_saturated_handler(request: Request, exc: hashing.HashPoolSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
 
+async def coalescing_timeout_handler(request: Request, exc: coalescing.CoalescingTimeout):
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Timed out waiting for the database"},
+    )
 
+async def read_your_writes(request: Request, call_next):
+    # After a successful write the client reads from the primary for a
+    # while, so it sees its own change despite replica lag.
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        routing.pin_to_primary(response)
+    return response
 
 # User endpoints
 
-@app.post("/register", response_model=schemas.UserBase)
-def create_user(user: schemas.UserIn, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, username=user.username)
+@user_router.post("/register", response_model=schemas.UserBase)
+async def create_user(user: schemas.UserIn, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user(db, username=user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="User already registered")
-    hashed_password = security.get_password_hash(user.password)
+    hashed_password = await hashing.hash_password(user.password)
     db_user = models.User(
         **user.dict(exclude={"password"}), hashed_password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-@app.post("/token", response_model=schemas.Token)
+@user_router.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    user = authentication.get_user(db, username=form_data.username)
-    if not user or not security.pwd_context.verify(
-        form_data.password, user.hashed_password
-    ):
+    user = await async_crud.get_user(db, username=form_data.username)
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await hashing.verify_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Not valid credentials",
         headers={"WWW-Authenticate": "Bearer"},
         )
+    # Transparently upgrade hashes made with outdated settings (e.g. a lower cost)
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": user.username}, expire_delta=access_token_expires
+        data=security.user_claims(user), expire_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/user/me", response_model=schemas.UserBase)
-async def read_users_me(current_user: schemas.UserBase = Depends(get_current_user)):
+@user_router.post("/logout")
+async def logout(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user)
+):
+    revocation.revoke(db, jti=current_user.jti)
+    await db.commit()
+    return {"message": "Logged out successfully"}
+
+@user_router.get("/user/me", response_model=schemas.UserBase)
+async def read_users_me(current_user: schemas.Principal = Depends(get_current_user)):
     return current_user
 
     
-@app.put("/users/{username}", response_model=schemas.UserBase)
+@user_router.put("/users/{username}", response_model=schemas.UserBase)
 async def update_user(
     username: str,
     user_update: schemas.UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: schemas.UserBase = Depends(authentication.get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(authentication.get_current_user)
 ):
     # Check if the current user is authorized to update the specified user
     if current_user.username != username:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this user")
 
     # Retrieve the user to be updated
-    db_user = crud.get_user(db, username=username)
+    db_user = await async_crud.get_user(db, username=username)
     if db_user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
     # Perform the update operation
-    updated_user = crud.update_user(db, username, user_update)
+    updated_user = await async_crud.update_user(db, username, user_update)
     if updated_user is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update user")
 
@@ -87,17 +157,17 @@ async def get_user(email: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
     return db_user"""
 
-@app.delete("/users/{user_id}")
+@user_router.delete("/users/{user_id}")
 async def delete_user(
     user_id: uuid.UUID,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(authentication.get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(authentication.get_current_user)
 ):
     # Check if the user trying to delete the account is the same as the authenticated user
     if current_user.id != user_id:
         raise HTTPException(status_code=403, detail="You are not authorized to delete this user")
     
-    deleted_user = crud.delete_user_by_id(db, user_id)
+    deleted_user = await async_crud.delete_user_by_id(db, user_id)
     if not deleted_user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -107,49 +177,233 @@ async def delete_user(
 
 # Product endpoints
 
-@app.get("/products/{id}", response_model=schemas.ProductBase)
-async def get_product(id: uuid.UUID, db: Session = Depends(get_db)):
-    db_product = crud.get_product(db, id=id)
+# Declared before /products/{id} so "export", "autocomplete" and "search" are
+# not parsed as a product id.
+@product_router.get("/products/export")
+def export_products(format: ExportFormatEnum = ExportFormatEnum.NDJSON):
+    # The stream outlives the request's dependencies, so it owns its session.
+    def generate():
+        db = SessionLocal()
+        try:
+            batches = crud.stream_products(db, batch_size=EXPORT_BATCH_SIZE)
+            encode = export.iter_csv if format == ExportFormatEnum.CSV else export.iter_ndjson
+            yield from encode(crud.PRODUCT_EXPORT_COLUMNS, batches)
+        finally:
+            db.close()
+
+    if format == ExportFormatEnum.CSV:
+        return StreamingResponse(
+            generate(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="products.csv"'},
+        )
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@product_router.post("/products/import", response_model=schemas.ImportResult)
+async def import_products(
+    request: Request,
+    format: ExportFormatEnum = ExportFormatEnum.NDJSON,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+):
+    # The body is read as it arrives (CSV with a header row, or NDJSON) and
+    # loaded in chunks, so an upload of any size holds one chunk in memory.
+    # Rows are upserted on name; invalid rows are reported by line and skipped.
+    chunks = bulk_import.chunks(request.stream(), format)
+    return await async_crud.import_products(db, chunks)
+
+@product_router.get("/products/autocomplete", response_model=schemas.Autocomplete)
+async def autocomplete_products(
+    q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=50)
+):
+    # Served from the in-process prefix index; no database round trip.
+    return autocomplete.products.complete(q, limit)
+
+@product_router.get("/products/search", response_model=schemas.ProductPage)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(PRODUCTS_PAGE_DEFAULT, ge=1, le=PRODUCTS_PAGE_MAX),
+    db: AsyncSession = Depends(routing.get_async_read_db),
+):
+    try:
+        products, next_cursor = await coalescing.reads.do(
+            ("products-search", q, cursor, limit, db.bind),
+            lambda: in_own_async_session(db.bind, async_crud.search_products, q=q, limit=limit, cursor=cursor),
+        )
+    except pagination.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if serialization.FAST_RESPONSES:
+        return serialization.json_response(serialization.product_page_json(products, next_cursor))
+    return {"items": products, "next_cursor": next_cursor}
+
+@product_router.get("/products/{id}", response_model=schemas.ProductSummary)
+async def get_product(
+    id: uuid.UUID, request: Request, response: Response, db: AsyncSession = Depends(routing.get_async_read_db)
+):
+    db_product = await async_crud.get_product_cached(db, id=id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
+    # Validators come from the cached snapshot, so a 304 costs no query and no serialization
+    etag = conditional.make_etag(db_product["id"], db_product["updated_at"])
+    if conditional.is_not_modified(request, etag, db_product["updated_at"]):
+        return conditional.not_modified(etag, db_product["updated_at"])
+    if serialization.FAST_RESPONSES:
+        response = serialization.json_response(serialization.product_json(db_product))
+        conditional.set_validators(response, etag, db_product["updated_at"])
+        return response
+    conditional.set_validators(response, etag, db_product["updated_at"])
     return db_product
 
-@app.get("/products/", response_model=List[schemas.ProductBase])
-async def get_products(db: Session = Depends(get_db)):
-    products = crud.get_products(db)
-    if not products:
-        raise HTTPException(status_code=404, detail="No products found")
-    return products
-
-@app.post("/products/", response_model=schemas.ProductBase)
-async def add_product(product: schemas.ProductAdd, db: Session = Depends(get_db)):
-    return crud.add_product(db=db, product=product)
+@product_router.get("/products/", response_model=schemas.ProductPage)
+async def get_products(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(PRODUCTS_PAGE_DEFAULT, ge=1, le=PRODUCTS_PAGE_MAX),
+    brand: Optional[str] = None,
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    db: AsyncSession = Depends(routing.get_async_read_db),
+):
+    page = dict(limit=limit, cursor=cursor, brand=brand, price_min=price_min, price_max=price_max)
+    # Identical concurrent page requests against the same database share one query.
+    key = (cursor, limit, brand, price_min, price_max, db.bind)
+    try:
+        if conditional.is_conditional(request):
+            # The page's version stamp is its (id, updated_at) pairs: a light
+            # query that can answer 304 before any full row is loaded.
+            versions, next_cursor = await coalescing.reads.do(
+                ("products-version", *key),
+                lambda: in_own_async_session(db.bind, async_crud.get_products_version, **page),
+            )
+            etag = conditional.collection_etag(versions, next_cursor)
+            last_modified = conditional.last_modified_of(versions)
+            if conditional.is_not_modified(request, etag, last_modified):
+                return conditional.not_modified(etag, last_modified)
+        products, next_cursor = await coalescing.reads.do(
+            ("products", *key), lambda: in_own_async_session(db.bind, async_crud.get_products, **page)
+        )
+    except pagination.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    etag = conditional.collection_etag(products, next_cursor)
+    last_modified = conditional.last_modified_of(products)
+    if serialization.FAST_RESPONSES:
+        response = serialization.json_response(serialization.product_page_json(products, next_cursor))
+        conditional.set_validators(response, etag, last_modified)
+        return response
+    conditional.set_validators(response, etag, last_modified)
+    return {"items": products, "next_cursor": next_cursor}
+
+@product_router.get("/products/{id}/reviews", response_model=schemas.ReviewPage)
+async def get_product_reviews(
+    id: uuid.UUID,
+    cursor: Optional[str] = None,
+    limit: int = Query(PRODUCTS_PAGE_DEFAULT, ge=1, le=PRODUCTS_PAGE_MAX),
+    db: AsyncSession = Depends(routing.get_async_read_db),
+):
+    if await async_crud.get_product_cached(db, id=id) is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    try:
+        reviews, next_cursor = await async_crud.get_product_reviews(db, product_id=id, limit=limit, cursor=cursor)
+    except pagination.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": reviews, "next_cursor": next_cursor}
+
+@product_router.post("/products/", response_model=schemas.ProductBase)
+async def add_product(product: schemas.ProductAdd, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.add_product(db=db, product=product)
+
+def check_bulk_filter(selection: schemas.ProductFilter):
+    # A bulk change never falls back to the whole catalog
+    if selection.ids is None and selection.brand is None and selection.price_min is None and selection.price_max is None:
+        raise HTTPException(status_code=400, detail="Give ids or at least one filter")
+    if selection.ids is not None and len(selection.ids) > BULK_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_IDS} ids per request")
+
+@product_router.post("/products/bulk-update", response_model=schemas.BulkResult)
+async def bulk_update_products(
+    change: schemas.ProductBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+):
+    check_bulk_filter(change.filter)
+    if change.price is not None and change.price_change_percent is not None:
+        raise HTTPException(status_code=400, detail="Give either price or price_change_percent")
+    if change.price is None and change.price_change_percent is None and change.brand is None:
+        raise HTTPException(status_code=400, detail="Nothing to change")
+    if (change.price is not None and change.price < 0) or (
+        change.price_change_percent is not None and change.price_change_percent <= -100
+    ):
+        raise HTTPException(status_code=400, detail="Prices cannot go below zero")
+    return await async_crud.bulk_update_products(db, change, batch_size=BULK_BATCH_SIZE)
+
+@product_router.post("/products/bulk-delete", response_model=schemas.BulkResult)
+async def bulk_delete_products(
+    request: schemas.ProductBulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(get_current_user),
+):
+    # Products that appear on an order are kept
+    check_bulk_filter(request.filter)
+    return await async_crud.bulk_delete_products(db, request.filter, batch_size=BULK_BATCH_SIZE)
 
-@app.delete("/products/{id}")
-async def delete_product(id: uuid.UUID, db: Session = Depends(get_db)):
-    deleted_product = crud.delete_product(db, id=id)
+@product_router.delete("/products/{id}")
+async def delete_product(id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    deleted_product = await async_crud.delete_product(db, id=id)
     if not deleted_product:
         raise HTTPException(status_code=404, detail="Product not found")
     return {"message": "Product deleted successfully"}
 
 # Order endpoints
-@app.post("/orders/", response_model=schemas.OrderBase)
+@order_router.post("/orders/", response_model=schemas.OrderBase)
 async def set_order(
     order_set: schemas.OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(authentication.get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(authentication.get_current_user)
 ):
     # Assuming `order_set` includes the user ID of the current user
     order_set.user_id = current_user.id
     
-    return crud.set_order(db=db, order_data=order_set)
+    try:
+        return await async_crud.set_order(db=db, order_data=order_set)
+    except crud.UnknownProductsError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={"message": "Unknown products", "product_ids": [str(id) for id in exc.product_ids]},
+        )
 
-@app.put("/orders/{order_id}", response_model=schemas.OrderBase)
+@order_router.get("/orders/{order_id}", response_model=schemas.OrderDetail)
+async def get_order(
+    order_id: uuid.UUID,
+    db: AsyncSession = Depends(routing.get_async_read_db),
+    current_user: schemas.Principal = Depends(authentication.get_current_user),
+):
+    # Another user's order is reported as missing, not forbidden
+    order = await async_crud.get_order_detail(db, order_id=order_id, owner_id=current_user.id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+@order_router.get("/users/me/orders", response_model=schemas.OrderPage)
+async def get_my_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(ORDERS_PAGE_DEFAULT, ge=1, le=ORDERS_PAGE_MAX),
+    db: AsyncSession = Depends(routing.get_async_read_db),
+    current_user: schemas.Principal = Depends(authentication.get_current_user),
+):
+    try:
+        orders, next_cursor = await async_crud.get_user_orders(db, owner_id=current_user.id, limit=limit, cursor=cursor)
+    except pagination.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": orders, "next_cursor": next_cursor}
+
+@order_router.put("/orders/{order_id}", response_model=schemas.OrderBase)
 def update_order(
     order_id: uuid.UUID,
     order_update: schemas.OrderUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(authentication.get_current_user)
+    current_user: schemas.Principal = Depends(authentication.get_current_user)
 ):
     db_order = crud.get_order(db, order_id=order_id)
     if db_order is None:
@@ -165,44 +419,63 @@ def update_order(
     
     return updated_order
 
-@app.delete("/orders/{id}")
-async def delete_order(order_id: uuid.UUID, db: Session = Depends(get_db),current_user: schemas.UserBase = Depends(authentication.get_current_user)):
-    deleted_order = crud.delete_order(db=db, order_id=order_id)
+@order_router.delete("/orders/{id}")
+async def delete_order(order_id: uuid.UUID, db: AsyncSession = Depends(get_async_db),current_user: schemas.Principal = Depends(authentication.get_current_user)):
+    deleted_order = await async_crud.delete_order(db=db, order_id=order_id)
     if not deleted_order:
         raise HTTPException(status_code=404, detail="Order not found")
     return {"message": "Order deleted successfully"}
 
 #Review Endpoints
 
-@app.post("/reviews/", response_model=schemas.Review)
+@review_router.post("/reviews/", response_model=schemas.Review)
 async def create_review(
     review: schemas.ReviewCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(authentication.get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Principal = Depends(authentication.get_current_user)
 ):
     # Check if the product exists
-    product = crud.get_product(db, id=review.product_id)
+    product = await async_crud.get_product_cached(db, id=review.product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
-    created_review = crud.create_review(db=db, review=review, user_id=current_user.id)
+    created_review = await async_crud.create_review(db=db, review=review, user_id=current_user.id)
     return created_review
 
-@app.get("/reviews/{review_id}", response_model=schemas.Review)
-def read_review(review_id: uuid.UUID, db: Session = Depends(get_db)):
-    db_review = crud.get_review(db=db, review_id=review_id)
+@review_router.get("/reviews/{review_id}", response_model=schemas.Review)
+def read_review(review_id: uuid.UUID, request: Request, response: Response, db: Session = Depends(routing.get_read_db)):
+    if conditional.is_conditional(request):
+        # Only updated_at is read to decide on a 304
+        updated_at = crud.get_review_version(db=db, review_id=review_id)
+        etag = conditional.make_etag(review_id, updated_at)
+        if updated_at is not None and conditional.is_not_modified(request, etag, updated_at):
+            return conditional.not_modified(etag, updated_at)
+
+    # Validated inside the shared call so every waiter gets a session-free object
+    def load(shared_db: Session):
+        review = crud.get_review(db=shared_db, review_id=review_id)
+        return schemas.Review.model_validate(review, from_attributes=True) if review is not None else None
+
+    db_review = coalescing.sync_reads.do(("review", review_id, db.bind), lambda: in_own_session(db.bind, load))
     if db_review is None:
         raise HTTPException(status_code=404, detail="Review not found")
+    etag = conditional.make_etag(review_id, db_review.updated_at)
+    if serialization.FAST_RESPONSES:
+        # Already a validated schemas.Review: dump it without re-validation
+        response = serialization.json_response(serialization.review_json(db_review))
+        conditional.set_validators(response, etag, db_review.updated_at)
+        return response
+    conditional.set_validators(response, etag, db_review.updated_at)
     return db_review
 
 
 
-@app.put("/reviews/{review_id}", response_model=schemas.Review)
+@review_router.put("/reviews/{review_id}", response_model=schemas.Review)
 def update_review(review_id: uuid.UUID, review: schemas.ReviewUpdate, db: Session = Depends(get_db),
-                  current_user: models.User = Depends(authentication.get_current_user)):
+                  current_user: schemas.Principal = Depends(authentication.get_current_user)):
      
     db_review = crud.get_review(db=db, review_id=review_id)
     
@@ -217,8 +490,8 @@ def update_review(review_id: uuid.UUID, review: schemas.ReviewUpdate, db: Sessio
 
 
 
-@app.delete("/reviews/{review_id}", response_model=schemas.Review)
-def delete_review(review_id: uuid.UUID, db: Session = Depends(get_db), current_user: models.User = Depends(authentication.get_current_user)):
+@review_router.delete("/reviews/{review_id}", response_model=schemas.Review)
+def delete_review(review_id: uuid.UUID, db: Session = Depends(get_db), current_user: schemas.Principal = Depends(authentication.get_current_user)):
     db_review = crud.get_review(db=db, review_id=review_id)
     
     if db_review is None:
@@ -229,3 +502,88 @@ def delete_review(review_id: uuid.UUID, db: Session = Depends(get_db), current_u
     
     deleted_review = crud.delete_review(db=db, review_id=review_id)
     return deleted_review
+
+# Internal endpoints
+
+@internal_router.get("/internal/cache")
+async def cache_stats():
+    return {"products": cache.products.stats(), "autocomplete": autocomplete.products.stats()}
+
+@internal_router.get("/internal/db/pool")
+async def pool_stats():
+    return {name: stats.snapshot() for name, stats in pool_metrics.registry.items()}
+
+@internal_router.get("/internal/db/replicas")
+async def replica_status():
+    return {"sync": routing.get_replicas().status(), "async": routing.get_async_replicas().status()}
+
+@internal_router.get("/internal/db/slow-queries")
+async def slow_query_log(limit: int = Query(50, ge=1, le=slow_queries.SLOW_QUERY_BUFFER)):
+    # Newest first; the same entries go to the SLOW_QUERY_LOG file
+    return list(slow_queries.recent)[::-1][:limit]
+
+@internal_router.get("/internal/coalescing")
+async def coalescing_stats():
+    return {"async": coalescing.reads.stats(), "sync": coalescing.sync_reads.stats()}
+
+async def metrics():
+    # Mounted by create_app() when METRICS_ENABLED
+    return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def create_app() -> FastAPI:
+    # Nothing here touches the database: the engines are created on first
+    # use, and the schema belongs to the migrations (alembic upgrade head).
+    app = FastAPI(default_response_class=ORJSONResponse if serialization.FAST_RESPONSES else JSONResponse)
+    for router in (user_router, product_router, order_router, review_router, internal_router):
+        app.include_router(router)
+    app.add_exception_handler(hashing.HashPoolSaturated, hash_pool_saturated_handler)
+    app.add_exception_handler(coalescing.CoalescingTimeout, coalescing_timeout_handler)
+
+    if routing.DATABASE_REPLICA_URLS:
+        app.middleware("http")(read_your_writes)
+    if slow_queries.SLOW_QUERY_MS > 0:
+        app.add_middleware(slow_queries.RouteScopeMiddleware)
+    if request_metrics.METRICS_ENABLED:
+        # Outermost, so the latency covers the other middleware too
+        request_metrics.listen()
+        app.add_middleware(request_metrics.MetricsMiddleware)
+        app.add_api_route("/metrics", metrics, include_in_schema=False)
+
+    @app.on_event("startup")
+    async def start_revocation_refresh():
+        # Replays the shared revocation log into this worker's in-process list.
+        # The first load is awaited: until it succeeds, authenticated routes
+        # answer 503 instead of accepting tokens that may have been revoked.
+        await revocation.refresh_once(AsyncSessionLocal)
+        app.state.revocation_refresh = asyncio.create_task(revocation.refresh_forever(AsyncSessionLocal))
+
+    @app.on_event("startup")
+    async def build_autocomplete():
+        app.state.autocomplete_rebuild = asyncio.create_task(autocomplete.load_and_rebuild(AsyncSessionLocal))
+
+    @app.on_event("shutdown")
+    def shutdown_hash_pool():
+        hashing.pool.shutdown()
+
+    @app.on_event("shutdown")
+    def stop_revocation_refresh():
+        app.state.revocation_refresh.cancel()
+
+    @app.on_event("shutdown")
+    def stop_autocomplete_rebuild():
+        app.state.autocomplete_rebuild.cancel()
+
+    @app.on_event("shutdown")
+    async def dispose_engines():
+        # Last, after the background tasks above are cancelled
+        dispose_engine()
+        routing.dispose_replicas()
+        await dispose_async_engine()
+        await routing.dispose_async_replicas()
+
+    return app
+
+
+# For `uvicorn main:app`; `uvicorn --factory main:create_app` builds a new one
+app = create_app()
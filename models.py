@@ -1,7 +1,7 @@
 from typing import List
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Numeric, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Numeric, String, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from schemas import PaymentMethodEnum
@@ -10,7 +10,7 @@ from db import Base
 from typing import List
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Numeric, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, Numeric, String, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from schemas import PaymentMethodEnum
@@ -42,19 +42,35 @@ class Product(Base):
     price = Column(Numeric(precision=10, scale=2))
     brand = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Denormalized from reviews, kept in step by the review CRUD functions
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_review_at = Column(DateTime, nullable=True)
 
 #Relationship
     reviews = relationship("Review", back_populates="product")
 
+#Indexes backing the keyset pagination of GET /products/ and its filters
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_brand_created_at_id", "brand", "created_at", "id"),
+        Index("ix_products_price", "price"),
+        # Full-text search (search.py); SQLite uses an FTS5 table instead
+        Index(
+            "ix_products_search",
+            text("to_tsvector('simple'::regconfig, coalesce(name, '') || ' ' || coalesce(brand, ''))"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
 #OrderModel-Table
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
-    owner_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), index=True, default=uuid.uuid4)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), default=uuid.uuid4)
     shipping_address = Column(String) 
     payment_method = Column(Enum(PaymentMethodEnum))
     
@@ -62,12 +78,18 @@ class Order(Base):
     owner = relationship("User", back_populates="orders")
     order_products = relationship("OrderProduct", back_populates="order")
 
+    # A user's order history, newest first; also serves lookups by owner_id
+    __table_args__ = (
+        Index("ix_orders_owner_id_created_at_id", "owner_id", "created_at", "id"),
+    )
+
 #PivoteTable: To assert Order-Product ManytoMany Relationship
 class OrderProduct(Base):
     __tablename__ = 'order_product'
 
     order_id = Column(UUID(as_uuid=True), ForeignKey('orders.id'), primary_key=True, nullable=False)
-    product_id = Column(UUID(as_uuid=True), ForeignKey('products.id'), primary_key=True, nullable=False)
+    # Second in the primary key, so lookups by product alone need their own index
+    product_id = Column(UUID(as_uuid=True), ForeignKey('products.id'), primary_key=True, nullable=False, index=True)
     
     #Relationships
     order = relationship("Order", back_populates="order_products")
@@ -80,10 +102,26 @@ class Review(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     product_id = Column(UUID(as_uuid=True), ForeignKey('products.id'))
     review_content = Column(String)
-    review_maker_id = Column(UUID(as_uuid=True), ForeignKey('users.id'))
+    review_maker_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     product = relationship("Product", back_populates="reviews")
-    review_maker = relationship("User", back_populates="reviews")
\ No newline at end of file
+    review_maker = relationship("User", back_populates="reviews")
+
+    # Keyset pagination of a product's reviews; also serves lookups by product_id
+    __table_args__ = (
+        Index("ix_reviews_product_id_created_at_id", "product_id", "created_at", "id"),
+    )
+
+#TokenRevocation-Table: append-only log that every worker replays into its
+#in-process revocation list (see revocation.py)
+class TokenRevocation(Base):
+    __tablename__ = 'token_revocations'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String, nullable=True)  # a single logged-out token
+    user_id = Column(UUID(as_uuid=True), nullable=True)  # every token of a changed/deleted user
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)  # incremental refresh reads by this
+    expires_at = Column(DateTime)  # after this, every affected token has expired anyway
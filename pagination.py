@@ -0,0 +1,47 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+# Cursors are opaque to clients: a urlsafe base64 of the sort key of the
+# last row on the page.
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    return _encode([created_at.isoformat(), str(id)])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        created_at, id = _decode(cursor)
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+
+
+# Search results are ordered by (score desc, id).
+def encode_search_cursor(score: float, id: uuid.UUID) -> str:
+    return _encode([score, str(id)])
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, uuid.UUID]:
+    try:
+        score, id = _decode(cursor)
+        return float(score), uuid.UUID(id)
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
@@ -0,0 +1,99 @@
+import time
+from bisect import bisect_left
+from typing import Dict
+
+from sqlalchemy import event, exc
+
+# Upper bounds (seconds) of the checkout wait histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolStats:
+    """Counters for one engine's pool, fed by pool events and the
+    instrumented pool class below."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checkout_failures = 0
+        self.wait_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.pool = None
+
+    def observe_wait(self, seconds: float):
+        self.wait_counts[bisect_left(WAIT_BUCKETS, seconds)] += 1
+        self.wait_sum += seconds
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        cumulative, buckets = 0, {}
+        for bound, count in zip(WAIT_BUCKETS + (float("inf"),), self.wait_counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "pool": type(pool).__name__ if pool is not None else None,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else self.checkouts - self.checkins,
+            "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "checkout_failures": self.checkout_failures,
+            "wait_seconds": {"buckets": buckets, "sum": self.wait_sum, "count": cumulative},
+        }
+
+
+registry: Dict[str, PoolStats] = {}
+
+
+def stats_for(name: str) -> PoolStats:
+    if name not in registry:
+        registry[name] = PoolStats(name)
+    return registry[name]
+
+
+def instrumented(pool_class, stats: PoolStats):
+    # No pool event fires before a checkout starts waiting, so the wait and
+    # timeout failures are measured around the pool's own _do_get.
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                stats.checkout_failures += 1
+                raise
+            finally:
+                stats.observe_wait(time.perf_counter() - started)
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def listen(engine, name: str) -> PoolStats:
+    stats = stats_for(name)
+    stats.pool = engine.pool
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        stats.connects += 1
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.checkouts += 1
+        # engine.dispose() swaps in a new pool; keep reading from the live one
+        stats.pool = engine.pool
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        stats.checkins += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        stats.invalidations += 1
+
+    return stats
@@ -0,0 +1,173 @@
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# METRICS_ENABLED=0 leaves out the middleware, the cursor hooks and /metrics.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Upper bounds of the histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Requests that matched no route share one label, so stray URLs cannot grow
+# the registry without bound.
+UNMATCHED = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class RouteStats:
+    def __init__(self):
+        self.duration = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Per-process, like the other /internal stats: with several workers each one
+# reports its own requests.
+registry: Dict[Tuple[str, str], RouteStats] = {}
+current: ContextVar[Optional[RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+def record(method: str, route: str, status: int, seconds: float, size: int, request: RequestStats):
+    # Only called from the middleware, on the event loop thread, so the
+    # registry needs no lock.
+    stats = registry.get((method, route))
+    if stats is None:
+        stats = registry[(method, route)] = RouteStats()
+    stats.duration.observe(seconds)
+    stats.queries.observe(request.queries)
+    stats.response_size.observe(size)
+    stats.db_seconds += request.db_seconds
+    stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Queries run in a worker thread (sync endpoints) or in SQLAlchemy's
+    # greenlet (async ones) still see the request's context.
+    request = current.get()
+    if request is not None:
+        request.queries += 1
+        request.db_seconds += time.perf_counter() - context._metrics_started
+
+
+def listen():
+    # On the Engine class: the primary, async and replica engines alike.
+    # Once per process, however many apps create_app() builds.
+    if event.contains(Engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times each HTTP request up to its last body
+    chunk, so streamed responses count in full, and adds up the body size."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = RequestStats()
+        token = current.set(request)
+        started = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            current.reset(token)
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            record(
+                scope["method"], getattr(route, "path", UNMATCHED), status,
+                time.perf_counter() - started, size, request,
+            )
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram(lines: list, name: str, histogram: Histogram, labels: dict):
+    cumulative = 0
+    for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{_labels(**labels, le=le)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+
+
+FAMILIES = (
+    ("http_request_duration_seconds", "histogram", "Request latency, until the last body chunk.", "duration"),
+    ("http_request_db_queries", "histogram", "SQL statements sent per request.", "queries"),
+    ("http_response_size_bytes", "histogram", "Response body size.", "response_size"),
+)
+
+
+def render() -> str:
+    # Prometheus text exposition format 0.0.4
+    routes = sorted(registry.items())
+    lines = []
+    for name, kind, help_text, attribute in FAMILIES:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for (method, route), stats in routes:
+            _histogram(lines, name, getattr(stats, attribute), {"method": method, "route": route})
+    lines += [
+        "# HELP http_request_db_seconds_total Time spent executing SQL statements.",
+        "# TYPE http_request_db_seconds_total counter",
+    ]
+    for (method, route), stats in routes:
+        lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {stats.db_seconds}")
+    lines += ["# HELP http_requests_total Requests by response status.", "# TYPE http_requests_total counter"]
+    for (method, route), stats in routes:
+        for status, count in sorted(stats.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select
+
+import models
+import security
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+REVOCATION_REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def _epoch(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationList:
+    """In-process view of the token_revocations log.
+
+    Tokens are rejected when their jti was logged out, or when they were
+    issued before their user was last changed or deleted. Entries are dropped
+    once every token they cover has expired, so memory stays bounded by the
+    revocations of one token lifetime.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, float] = {}  # jti -> expires_at
+        self._users: Dict[uuid.UUID, Tuple[float, float]] = {}  # user_id -> (cutoff, expires_at)
+        self.since: Optional[datetime] = None
+        # Until the first refresh succeeds nothing is known to be revoked, so
+        # get_current_user turns every token away rather than trusting it.
+        self.loaded = False
+
+    def is_revoked(self, jti: str, user_id: uuid.UUID, issued_at: float) -> bool:
+        if jti in self._tokens:
+            return True
+        entry = self._users.get(user_id)
+        return entry is not None and issued_at < entry[0]
+
+    def apply(self, jti: Optional[str], user_id: Optional[uuid.UUID], revoked_at: datetime, expires_at: datetime):
+        # Idempotent, so overlapping refreshes can replay the same rows.
+        expires = _epoch(expires_at)
+        if jti is not None:
+            self._tokens[jti] = expires
+        if user_id is not None:
+            cutoff = _epoch(revoked_at)
+            current = self._users.get(user_id)
+            if current is None or current[0] < cutoff:
+                self._users[user_id] = (cutoff, expires)
+
+    def prune(self, now: float):
+        for jti, expires_at in list(self._tokens.items()):
+            if expires_at <= now:
+                self._tokens.pop(jti, None)
+        for user_id, (_, expires_at) in list(self._users.items()):
+            if expires_at <= now:
+                self._users.pop(user_id, None)
+
+    async def refresh(self, db):
+        # Incremental: only rows revoked since the last refresh are read. The
+        # overlap covers rows whose transaction committed after a later one.
+        now = datetime.utcnow()
+        statement = select(
+            models.TokenRevocation.jti,
+            models.TokenRevocation.user_id,
+            models.TokenRevocation.revoked_at,
+            models.TokenRevocation.expires_at,
+        ).where(models.TokenRevocation.expires_at > now)
+        if self.since is not None:
+            statement = statement.where(
+                models.TokenRevocation.revoked_at > self.since - REVOCATION_REFRESH_OVERLAP
+            )
+        for jti, user_id, revoked_at, expires_at in (await db.execute(statement)).all():
+            self.apply(jti, user_id, revoked_at, expires_at)
+            if self.since is None or revoked_at > self.since:
+                self.since = revoked_at
+        self.prune(_epoch(now))
+        self.loaded = True
+
+
+revocations = RevocationList()
+
+
+def revoke(db, user_id: Optional[uuid.UUID] = None, jti: Optional[str] = None):
+    # The row joins the caller's transaction, so other workers only see it if
+    # the change that caused it commits. This worker applies it right away,
+    # which fails safe: a rolled-back change only costs the user a new login.
+    now = datetime.utcnow()
+    expires_at = now + timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
+    db.add(models.TokenRevocation(user_id=user_id, jti=jti, revoked_at=now, expires_at=expires_at))
+    revocations.apply(jti, user_id, now, expires_at)
+
+
+async def refresh_once(session_factory) -> bool:
+    try:
+        async with session_factory() as db:
+            await revocations.refresh(db)
+        return True
+    except Exception:
+        logger.exception("Token revocation refresh failed")
+        return False
+
+
+async def refresh_forever(session_factory):
+    # After the first load, which startup awaits; if that one failed, this
+    # keeps retrying and tokens are accepted once it succeeds.
+    while True:
+        await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+        await refresh_once(session_factory)
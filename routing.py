@@ -0,0 +1,184 @@
+import itertools
+import os
+import threading
+import time
+from typing import List
+
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import cache
+import pool_metrics
+import slow_queries
+from async_db import get_async_engine, to_async_url
+from db import connect_args_for, get_engine, pool_options_for
+
+# Comma-separated sync URLs of read replicas; reads use the primary when empty.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a replica that failed is skipped before it is tried again.
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# After a write, the client's reads go to the primary for this long, which
+# should cover the replicas' usual lag.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+PRIMARY_PIN_COOKIE = "primary_until"
+
+
+class ReplicaSet:
+    """Round-robin over the replicas that are currently considered healthy.
+
+    A replica is marked down when a query on it fails at the connection level
+    and is retried after ``retry_after`` seconds. With no healthy replica,
+    reads fall back to the primary.
+    """
+
+    def __init__(self, primary, replicas: List, retry_after: float = REPLICA_RETRY_SECONDS):
+        self.primary = primary
+        self.replicas = replicas
+        self.retry_after = retry_after
+        self._down_until = {}
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self._lock = threading.Lock()
+
+    def choose(self):
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                candidate = next(self._cycle)
+                if self._down_until.get(candidate, 0) <= now:
+                    return candidate
+        return self.primary
+
+    def report_failure(self, bind, error: Exception):
+        # Only connection-level failures count; a bad query is not a bad replica.
+        if bind is self.primary:
+            return
+        if isinstance(error, (OperationalError, InterfaceError)) or getattr(error, "connection_invalidated", False):
+            self._down_until[bind] = time.monotonic() + self.retry_after
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {"url": replica.url.render_as_string(hide_password=True),
+             "healthy": self._down_until.get(replica, 0) <= now}
+            for replica in self.replicas
+        ]
+
+
+def _sync_replica(index: int, url: str):
+    replica = create_engine(url, connect_args=connect_args_for(url), **pool_options_for(url, f"replica{index}"))
+    pool_metrics.listen(replica, f"replica{index}")
+    slow_queries.listen(replica, f"replica{index}")
+    return replica
+
+
+def _async_replica(index: int, url: str):
+    async_url = to_async_url(url)
+    replica = create_async_engine(
+        async_url, **pool_options_for(async_url, f"replica{index}_async", AsyncAdaptedQueuePool)
+    )
+    pool_metrics.listen(replica.sync_engine, f"replica{index}_async")
+    slow_queries.listen(replica, f"replica{index}_async")
+    return replica
+
+
+_replicas = None
+_async_replicas = None
+_replicas_lock = threading.Lock()
+
+
+def get_replicas() -> ReplicaSet:
+    # Built on first use, like the primary engines
+    global _replicas
+    if _replicas is None:
+        with _replicas_lock:
+            if _replicas is None:
+                _replicas = ReplicaSet(
+                    get_engine(), [_sync_replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS)]
+                )
+    return _replicas
+
+
+def get_async_replicas() -> ReplicaSet:
+    global _async_replicas
+    if _async_replicas is None:
+        _async_replicas = ReplicaSet(
+            get_async_engine(), [_async_replica(i, url) for i, url in enumerate(DATABASE_REPLICA_URLS)]
+        )
+    return _async_replicas
+
+
+def dispose_replicas():
+    global _replicas
+    replicas, _replicas = _replicas, None
+    for replica in replicas.replicas if replicas is not None else ():
+        replica.dispose()
+
+
+async def dispose_async_replicas():
+    global _async_replicas
+    replicas, _async_replicas = _async_replicas, None
+    for replica in replicas.replicas if replicas is not None else ():
+        await replica.dispose()
+
+
+def _forget_replicas_after_fork():
+    # As db._forget_engine_after_fork, for the replica engines
+    global _replicas, _async_replicas, _replicas_lock
+    _replicas_lock = threading.Lock()
+    for replica_set in (_replicas, _async_replicas):
+        for replica in replica_set.replicas if replica_set is not None else ():
+            getattr(replica, "sync_engine", replica).dispose(close=False)
+    _replicas = _async_replicas = None
+
+
+os.register_at_fork(after_in_child=_forget_replicas_after_fork)
+
+if DATABASE_REPLICA_URLS:
+    # A read from a lagging replica right after a write must not re-fill the cache.
+    cache.products.quarantine = READ_YOUR_WRITES_SECONDS
+
+
+def pinned_to_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def pin_to_primary(response):
+    # Set on every successful write; the cookie carries the deadline, so any
+    # worker can honour it without shared state.
+    response.set_cookie(
+        PRIMARY_PIN_COOKIE,
+        str(time.time() + READ_YOUR_WRITES_SECONDS),
+        max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+        httponly=True,
+    )
+
+
+def get_read_db(request: Request):
+    replicas = get_replicas()
+    bind = replicas.primary if pinned_to_primary(request) else replicas.choose()
+    db = Session(bind=bind, autoflush=False)
+    try:
+        yield db
+    except DBAPIError as error:
+        replicas.report_failure(bind, error)
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    replicas = get_async_replicas()
+    bind = replicas.primary if pinned_to_primary(request) else replicas.choose()
+    async with AsyncSession(bind=bind, autoflush=False, expire_on_commit=False) as db:
+        try:
+            yield db
+        except DBAPIError as error:
+            replicas.report_failure(bind, error)
+            raise
@@ -28,6 +28,11 @@ class UserInDbase(UserBase):
 class UserInDB(UserInDbase):#used to retrieve sensitive user data
     hashed_password: str
         
+class Principal(UserBase):#authenticated caller, built from token claims only
+    id: uuid.UUID
+    jti: str
+    exp: datetime
+    
 #Token shemas
 class TokenData(BaseModel):
     username : Optional[EmailStr] = None
@@ -49,6 +54,10 @@ class ProductBase(BaseModel):
     price: float
     brand: str
 
+class Autocomplete(BaseModel):
+    names: List[str]
+    brands: List[str]
+
 class ProductAdd(ProductBase):
     pass
 
@@ -59,6 +68,44 @@ class ProductUpdate(ProductBase):
 
     class Config:
         orm_mode = True
+
+class ProductSummary(ProductBase):#product as listed, with its review stats
+    review_count: int = 0
+    last_review_at: Optional[datetime] = None
+
+class ProductPage(BaseModel):
+    items: List[ProductSummary]
+    next_cursor: Optional[str] = None
+
+class ProductFilter(BaseModel):#products a bulk change applies to: all the given conditions hold
+    ids: Optional[List[uuid.UUID]] = None
+    brand: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+
+class ProductBulkUpdate(BaseModel):
+    filter: ProductFilter
+    price: Optional[float] = None
+    price_change_percent: Optional[float] = None  # e.g. -15 for 15% off, rounded to the cent
+    brand: Optional[str] = None
+
+class ProductBulkDelete(BaseModel):
+    filter: ProductFilter
+
+class BulkResult(BaseModel):#complete is False when a batch was rejected: count covers the batches committed before it
+    count: int
+    complete: bool = True
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+class ImportResult(BaseModel):#failed counts every rejected row, errors lists the first ones; duplicates counts rows replaced by a later one with the same name
+    inserted: int
+    updated: int
+    duplicates: int = 0
+    failed: int
+    errors: List[ImportRowError]
         
 
 #Order schemas
@@ -80,6 +127,23 @@ class OrderUpdate(OrderBase):
     
     class Config:
         from_attributes = True
+
+class OrderLine(BaseModel):
+    product_id: uuid.UUID
+    name: Optional[str] = None
+    price: Optional[float] = None
+    brand: Optional[str] = None
+
+class OrderDetail(OrderBase):#order with its line items, total summed by the database
+    id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
+    items: List[OrderLine]
+    total: float
+
+class OrderPage(BaseModel):
+    items: List[OrderDetail]
+    next_cursor: Optional[str] = None
         
 #Review Schemas 
 class ReviewBase(BaseModel):
@@ -96,7 +160,11 @@ class Review(ReviewBase):
     id: uuid.UUID
     created_at: datetime
     updated_at: datetime
-    review_maker_id: uuid.UUID
+    review_maker_id: Optional[uuid.UUID]  # None once the author's account is deleted
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ReviewPage(BaseModel):
+    items: List[Review]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,100 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import DDL, and_, column, event, func, literal_column, or_, select, table
+
+import models
+import pagination
+
+# Postgres: the query repeats the expression of the ix_products_search GIN
+# index (models.Product) with literals, not bound parameters, so the planner
+# still matches the index when the driver uses server-side prepared statements.
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+
+# SQLite (local runs and tests): an FTS5 index over products.rowid, kept up to
+# date by triggers. VACUUM may renumber rowids of a table without an INTEGER
+# PRIMARY KEY; after one, run INSERT INTO products_fts(products_fts) VALUES('rebuild').
+FTS_TABLE = "products_fts"
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(name, brand, content='products', content_rowid='rowid')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, brand) VALUES (new.rowid, new.name, new.brand);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand) VALUES ('delete', old.rowid, old.name, old.brand);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, brand ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, brand) VALUES ('delete', old.rowid, old.name, old.brand);
+        INSERT INTO {FTS_TABLE}(rowid, name, brand) VALUES (new.rowid, new.name, new.brand);
+    END""",
+)
+
+# Databases built with create_all (tests, benchmarks) get the fallback too;
+# migrated ones get it from the search migration.
+for statement in FTS_DDL:
+    event.listen(models.Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+TERM = re.compile(r"\w+")
+MAX_TERMS = 8
+SEARCH_COLUMNS = (
+    models.Product.id,
+    models.Product.name,
+    models.Product.price,
+    models.Product.brand,
+    models.Product.created_at,
+    models.Product.updated_at,
+    models.Product.review_count,
+    models.Product.last_review_at,
+)
+
+
+def include_name(name, type_, parent_names) -> bool:
+    # Alembic comparisons: the FTS5 table and its shadow tables are not models.
+    return not (type_ == "table" and name.startswith(FTS_TABLE))
+
+
+def terms_of(q: str) -> List[str]:
+    # Words only: the query syntax of either backend is never exposed to clients.
+    return TERM.findall(q.lower())[:MAX_TERMS]
+
+
+def _ranked_postgresql(terms: List[str]):
+    vector = func.to_tsvector(
+        SEARCH_CONFIG,
+        func.coalesce(models.Product.name, literal_column("''"))
+        .op("||")(literal_column("' '"))
+        .op("||")(func.coalesce(models.Product.brand, literal_column("''"))),
+    )
+    query = func.plainto_tsquery(SEARCH_CONFIG, " ".join(terms))
+    return select(*SEARCH_COLUMNS, func.ts_rank(vector, query).label("score")).where(vector.op("@@")(query))
+
+
+def _ranked_sqlite(terms: List[str]):
+    fts = table(FTS_TABLE, column("rowid"), column("rank"))
+    # bm25 is lower-is-better; negated so both backends sort by score desc.
+    return (
+        select(*SEARCH_COLUMNS, (-fts.c.rank).label("score"))
+        .join_from(models.Product, fts, literal_column("products.rowid") == fts.c.rowid)
+        .where(literal_column(FTS_TABLE).op("MATCH")(" ".join(f'"{term}"' for term in terms)))
+    )
+
+
+def search_statement(dialect: str, terms: List[str], limit: int, cursor: Optional[str] = None):
+    # Keyset over (score desc, id) rather than OFFSET, as in GET /products/.
+    # One extra row is fetched to know whether there is a next page.
+    ranked = (_ranked_sqlite(terms) if dialect == "sqlite" else _ranked_postgresql(terms)).subquery()
+    statement = select(ranked)
+    if cursor is not None:
+        score, last_id = pagination.decode_search_cursor(cursor)
+        statement = statement.where(
+            or_(ranked.c.score < score, and_(ranked.c.score == score, ranked.c.id > last_id))
+        )
+    return statement.order_by(ranked.c.score.desc(), ranked.c.id).limit(limit + 1)
+
+
+def split_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = pagination.encode_search_cursor(rows[-1].score, rows[-1].id)
+    return rows, next_cursor
@@ -1,28 +1,54 @@
 from datetime import datetime, timedelta
+import time
+import uuid
 from typing import Optional
 from jose import jwt
 from passlib.context import CryptContext
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
-
 
 SECURITY_KEY = os.getenv("SECURITY_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 33
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes below BCRYPT_ROUNDS are reported by pwd_context.needs_update and
+# get rehashed on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
 
 def get_password_hash(password:str):
     return pwd_context.hash(password)
 
+def verify_and_update_password(password: str, hashed_password: str):
+    # (valid, new_hash): new_hash is not None when pwd_context.needs_update
+    # says the stored hash should be upgraded.
+    return pwd_context.verify_and_update(password, hashed_password)
+
 def create_access_token(data: dict, expire_delta: Optional[timedelta]=None):
     to_encode = data.copy()
     if expire_delta:
         expire = datetime.utcnow() + expire_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti identifies the token for logout; a sub-second iat lets a token issued
+    # right after a user change be told apart from the ones it revoked.
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECURITY_KEY, ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
+
+def user_claims(user) -> dict:
+    # Everything handlers need about the caller, so authenticated requests
+    # can build a principal without loading the user row.
+    return {
+        "sub": user.username,
+        "uid": str(user.id),
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+    }
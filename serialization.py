@@ -0,0 +1,37 @@
+import os
+from typing import Iterable, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+import schemas
+
+# Opt-in high-throughput mode: orjson as the default response class, and the
+# hot read endpoints validate and encode to bytes in pydantic-core instead of
+# going through FastAPI's response_model path and the stdlib json encoder.
+FAST_RESPONSES = os.getenv("FAST_RESPONSES", "0") == "1"
+
+# Built once at import; pydantic-core compiles each schema a single time.
+# Validating through the response models keeps the output in step with them.
+product_adapter = TypeAdapter(schemas.ProductSummary)
+product_page_adapter = TypeAdapter(schemas.ProductPage)
+review_adapter = TypeAdapter(schemas.Review)
+
+
+def product_json(snapshot: dict) -> bytes:
+    return product_adapter.dump_json(product_adapter.validate_python(snapshot))
+
+
+def product_page_json(rows: Iterable, next_cursor: Optional[str]) -> bytes:
+    # Reads the columns off each row, as response_model would, but validates
+    # and encodes to bytes in pydantic-core in one pass.
+    page = product_page_adapter.validate_python({"items": rows, "next_cursor": next_cursor}, from_attributes=True)
+    return product_page_adapter.dump_json(page)
+
+
+def review_json(review: schemas.Review) -> bytes:
+    return review_adapter.dump_json(review)
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,92 @@
+import argparse
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+logger = logging.getLogger("serve")
+
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+# One worker process per core. Each imports the app itself and creates its
+# engines on first use, so no pool or connection is shared between them.
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", str(os.cpu_count() or 1)))
+# auto: uvloop and httptools when installed, asyncio and h11 otherwise
+SERVE_LOOP = os.getenv("SERVE_LOOP", "auto")
+SERVE_HTTP = os.getenv("SERVE_HTTP", "auto")
+# Idle keep-alive connections are closed after this many seconds. Behind a
+# load balancer it must be longer than the balancer's own idle timeout (60s
+# on the common ones), or the balancer reuses connections we just closed.
+SERVE_KEEP_ALIVE = int(os.getenv("SERVE_KEEP_ALIVE", "75"))
+# Pending connections the kernel queues per listening socket; capped by
+# net.core.somaxconn.
+SERVE_BACKLOG = int(os.getenv("SERVE_BACKLOG", "2048"))
+# On SIGTERM the workers stop accepting, finish the requests in flight for at
+# most this long, then run the shutdown handlers (which close the pools).
+SERVE_GRACEFUL_TIMEOUT = int(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))
+SERVE_ACCESS_LOG = os.getenv("SERVE_ACCESS_LOG", "0") == "1"
+
+SOMAXCONN_PATH = "/proc/sys/net/core/somaxconn"
+
+
+def resolve_loop(loop: str) -> str:
+    if loop == "auto":
+        return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    return loop
+
+
+def resolve_http(http: str) -> str:
+    if http == "auto":
+        return "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return http
+
+
+def somaxconn():
+    try:
+        with open(SOMAXCONN_PATH) as file:
+            return int(file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with uvicorn")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS)
+    parser.add_argument("--loop", choices=("auto", "uvloop", "asyncio"), default=SERVE_LOOP)
+    parser.add_argument("--http", choices=("auto", "httptools", "h11"), default=SERVE_HTTP)
+    parser.add_argument("--keep-alive", type=int, default=SERVE_KEEP_ALIVE)
+    parser.add_argument("--backlog", type=int, default=SERVE_BACKLOG)
+    parser.add_argument("--graceful-timeout", type=int, default=SERVE_GRACEFUL_TIMEOUT)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+    loop, http = resolve_loop(args.loop), resolve_http(args.http)
+    limit = somaxconn()
+    if limit is not None and args.backlog > limit:
+        logger.warning("backlog %d is above net.core.somaxconn; the kernel uses %d", args.backlog, limit)
+    logger.info(
+        "%d worker(s), loop=%s, http=%s, keep-alive=%ds, backlog=%d, graceful timeout=%ds",
+        args.workers, loop, http, args.keep_alive, args.backlog, args.graceful_timeout,
+    )
+    # An import string, not the app object: every worker imports main itself.
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=SERVE_ACCESS_LOG,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import asyncio
+import contextvars
+import logging
+import logging.handlers
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import orjson
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# Statements slower than this are recorded. 0 turns the recorder off.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Share of slow statements that also get their plan captured, and the least
+# time between two plans of the same statement.
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", "0.1"))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", "60"))
+# EXPLAIN ANALYZE runs the query again; it is cut off after this long.
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "5000"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+# JSON lines, rotated at SLOW_QUERY_LOG_BYTES; an empty path turns the file off.
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "slow_queries.jsonl")
+SLOW_QUERY_LOG_BYTES = int(os.getenv("SLOW_QUERY_LOG_BYTES", str(10 * 2**20)))
+SLOW_QUERY_LOG_BACKUPS = 5
+
+STATEMENT_MAX_CHARS = 4000
+WHITESPACE = re.compile(r"\s+")
+# EXPLAIN ANALYZE executes the statement: only plain reads get it. Writes and
+# locking reads get the estimated plan, which runs nothing and takes no lock.
+LOCKING = re.compile(r"\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b", re.IGNORECASE)
+
+recent: deque = deque(maxlen=SLOW_QUERY_BUFFER)
+current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("slow_query_scope", default=None)
+
+_file_logger = logging.getLogger("slow_queries.file")
+_file_logger.propagate = False
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+_explaining = contextvars.ContextVar("slow_query_explaining", default=False)
+_explain_slot = threading.Semaphore(1)
+_last_explained = {}
+_tasks = set()
+
+
+def _open_file_log():
+    # Opened on the first slow statement, so a quiet worker creates no file
+    if SLOW_QUERY_LOG and not _file_logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(
+            SLOW_QUERY_LOG, maxBytes=SLOW_QUERY_LOG_BYTES, backupCount=SLOW_QUERY_LOG_BACKUPS, delay=True
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _file_logger.addHandler(handler)
+        _file_logger.setLevel(logging.INFO)
+
+
+def parameter_shape(parameters, executemany: bool):
+    # Types, never values: bound parameters can hold personal data.
+    if executemany:
+        return {"sets": len(parameters), "first": parameter_shape(parameters[0], False) if parameters else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def plan_error(exc: Exception) -> str:
+    # The error class and SQLSTATE only: the message of a DBAPIError quotes
+    # the statement's bound values.
+    orig = getattr(exc, "orig", None)
+    if orig is None:
+        return type(exc).__name__
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return f"{type(orig).__name__} ({code})" if code else type(orig).__name__
+
+
+def route_of(scope: Optional[dict]) -> Optional[str]:
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope.get('method')} {getattr(route, 'path', scope.get('path'))}"
+
+
+def explain_prefix(dialect: str, statement: str) -> Optional[str]:
+    if dialect == "postgresql":
+        reads = statement.lstrip()[:6].upper() == "SELECT" and not LOCKING.search(statement)
+        return "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " if reads else "EXPLAIN (FORMAT JSON) "
+    if dialect == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return None
+
+
+def _plan_rows(dialect: str, rows):
+    if dialect == "sqlite":
+        return [row[-1] for row in rows]
+    plan = rows[0][0]
+    return orjson.loads(plan) if isinstance(plan, (str, bytes)) else plan
+
+
+def _publish(entry: dict):
+    recent.append(entry)
+    if SLOW_QUERY_LOG:
+        _open_file_log()
+        _file_logger.info(orjson.dumps(entry, default=str).decode())
+
+
+def _should_explain(statement: str, executemany: bool, prefix: Optional[str]) -> bool:
+    # At most one plan at a time and one per statement per interval, for a
+    # sample of the slow statements: a burst of slow queries cannot turn into
+    # a burst of EXPLAINs.
+    if executemany or prefix is None or random.random() >= SLOW_QUERY_EXPLAIN_SAMPLE:
+        return False
+    now = time.monotonic()
+    if now - _last_explained.get(statement, float("-inf")) < SLOW_QUERY_EXPLAIN_INTERVAL:
+        return False
+    if not _explain_slot.acquire(blocking=False):
+        return False
+    if len(_last_explained) > SLOW_QUERY_BUFFER * 10:
+        _last_explained.clear()
+    _last_explained[statement] = now
+    return True
+
+
+def _explain_sync(engine, dialect, entry, sql, parameters):
+    _explaining.set(True)
+    try:
+        with engine.connect() as connection:
+            if dialect == "postgresql":
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            entry["plan"] = _plan_rows(dialect, connection.exec_driver_sql(sql, parameters).all())
+            connection.rollback()
+    except Exception as exc:
+        entry["plan_error"] = plan_error(exc)
+    finally:
+        _explain_slot.release()
+        _publish(entry)
+
+
+async def _explain_async(async_engine, dialect, entry, sql, parameters):
+    _explaining.set(True)
+    try:
+        async with async_engine.connect() as connection:
+            if dialect == "postgresql":
+                await connection.exec_driver_sql(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            entry["plan"] = _plan_rows(dialect, (await connection.exec_driver_sql(sql, parameters)).all())
+            await connection.rollback()
+    except Exception as exc:
+        entry["plan_error"] = plan_error(exc)
+    finally:
+        _explain_slot.release()
+        _publish(entry)
+
+
+def listen(engine, name: str):
+    """Record the slow statements of an engine (sync or async). Plans are
+    captured on a separate connection from the same pool, off the request's
+    path: in a background thread, or a task on the event loop for async
+    engines, so the slow request does not also wait for its EXPLAIN."""
+    if SLOW_QUERY_MS <= 0:
+        return
+    async_engine = engine if isinstance(engine, AsyncEngine) else None
+    sync_engine = engine.sync_engine if async_engine is not None else engine
+    threshold = SLOW_QUERY_MS / 1000
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._slow_query_started
+        if elapsed < threshold or _explaining.get():
+            return
+        dialect = sync_engine.dialect.name
+        entry = {
+            "at": datetime.utcnow().isoformat(),
+            "database": name,
+            "duration_ms": round(elapsed * 1000, 2),
+            "route": route_of(current_scope.get()),
+            "statement": WHITESPACE.sub(" ", statement).strip()[:STATEMENT_MAX_CHARS],
+            "parameters": parameter_shape(parameters, executemany),
+            "plan": None,
+        }
+        prefix = explain_prefix(dialect, statement)
+        if not _should_explain(entry["statement"], executemany, prefix):
+            _publish(entry)
+            return
+        # A fresh context: the EXPLAIN is not part of the request's metrics
+        if async_engine is not None:
+            task = asyncio.get_running_loop().create_task(
+                _explain_async(async_engine, dialect, entry, prefix + statement, parameters),
+                context=contextvars.Context(),
+            )
+            _tasks.add(task)
+            task.add_done_callback(_tasks.discard)
+        else:
+            _explain_executor.submit(_explain_sync, sync_engine, dialect, entry, prefix + statement, parameters)
+
+
+class RouteScopeMiddleware:
+    """Pure ASGI middleware that makes the request's scope, and so its
+    matched route, visible to the cursor hooks above."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+# Before any app module is imported: db.py and security.py read these at import
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "tests.db")
+os.environ.setdefault("SECURITY_KEY", "test-secret-key")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("INTERNAL_API_TOKEN", "test-internal-token")
+os.environ.setdefault("SLOW_QUERY_LOG", "")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def engine():
+    import db, models, search  # search registers the SQLite FTS5 fallback with create_all
+
+    models.Base.metadata.create_all(bind=db.engine)
+    yield db.engine
+    db.dispose_engine()
+
+
+@pytest.fixture
+def product(engine):
+    import uuid
+
+    import db, models
+
+    with db.SessionLocal() as session:
+        product = models.Product(name=f"test product {uuid.uuid4()}", price=10, brand="test")
+        session.add(product)
+        session.commit()
+        return product.id
@@ -0,0 +1,48 @@
+import asyncio
+
+import autocomplete
+
+
+class FakeResult:
+    def __init__(self, rows, during):
+        self.rows = rows
+        self.during = during
+
+    async def partitions(self):
+        self.during()  # a write that commits while the table is being read
+        yield self.rows
+
+
+class FakeSession:
+    def __init__(self, rows, during=lambda: None):
+        self.result = FakeResult(rows, during)
+
+    async def stream(self, statement):
+        return self.result
+
+
+def test_write_already_in_the_snapshot_is_not_counted_twice():
+    index = autocomplete.Autocomplete()
+    # The new product committed before the read got to it, so the snapshot has it too
+    rows = [("red chair", "acme"), ("blue chair", "acme")]
+    asyncio.run(index.load(FakeSession(rows, lambda: index.add_product("blue chair", "acme"))))
+
+    index.discard_product("red chair", "acme")
+    index.discard_product("blue chair", "acme")
+    assert index.complete("acme", 10) == {"names": [], "brands": []}
+
+
+def test_writes_missing_from_the_snapshot_are_replayed():
+    index = autocomplete.Autocomplete()
+
+    def during():
+        index.add_product("green lamp", "lumo")  # committed after the read passed it
+        index.discard_product("red chair", "acme")  # deleted after the read loaded it
+
+    asyncio.run(index.load(FakeSession([("red chair", "acme"), ("blue chair", "acme")], during)))
+
+    assert index.complete("green", 10)["names"] == ["green lamp"]
+    assert index.complete("red", 10)["names"] == []
+    index.discard_product("blue chair", "acme")
+    index.discard_product("green lamp", "lumo")
+    assert index.stats() == {"names": 0, "brands": 0}
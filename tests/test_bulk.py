@@ -0,0 +1,87 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import select, text
+
+import async_crud
+import async_db
+import db
+import main
+import models
+import schemas
+
+PRODUCTS = 7
+
+
+@pytest.fixture
+def brand(engine):
+    # PRODUCTS products of a brand of their own, in id order
+    brand = f"bulk-{uuid.uuid4().hex}"
+    with db.SessionLocal() as session:
+        session.add_all(models.Product(name=f"{brand}-{i}", price=10, brand=brand) for i in range(PRODUCTS))
+        session.commit()
+    return brand
+
+
+def bulk(function, *args):
+    async def run():
+        async with async_db.AsyncSessionLocal() as session:
+            result = await function(session, *args, batch_size=2)
+        await async_db.dispose_async_engine()
+        return result
+    return asyncio.run(run())
+
+
+def prices(brand):
+    with db.SessionLocal() as session:
+        return session.scalars(
+            select(models.Product.price).where(models.Product.brand == brand).order_by(models.Product.id)
+        ).all()
+
+
+def test_bulk_update_pages_through_every_match(brand):
+    change = schemas.ProductBulkUpdate(filter=schemas.ProductFilter(brand=brand), price=20)
+    assert bulk(async_crud.bulk_update_products, change) == {"count": PRODUCTS, "complete": True}
+    assert prices(brand) == [20] * PRODUCTS
+
+
+def test_bulk_update_reports_the_batches_committed_before_a_rejected_one(engine, brand):
+    with db.SessionLocal() as session:
+        ids = session.scalars(
+            select(models.Product.id).where(models.Product.brand == brand).order_by(models.Product.id)
+        ).all()
+    with engine.begin() as connection:
+        # The fourth product, in the second batch of two, cannot be updated
+        connection.execute(text(
+            f"CREATE TRIGGER reject_bulk BEFORE UPDATE ON products WHEN OLD.id = '{ids[3].hex}' "
+            "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        ))
+    try:
+        change = schemas.ProductBulkUpdate(filter=schemas.ProductFilter(brand=brand), price=20)
+        assert bulk(async_crud.bulk_update_products, change) == {"count": 2, "complete": False}
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TRIGGER reject_bulk"))
+    assert prices(brand) == [20, 20] + [10] * (PRODUCTS - 2)
+
+
+def test_bulk_delete_pages_through_every_match(brand):
+    selection = schemas.ProductFilter(brand=brand)
+    assert bulk(async_crud.bulk_delete_products, selection) == {"count": PRODUCTS, "complete": True}
+    assert prices(brand) == []
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/products/bulk-update", {"filter": {"price_min": 0}, "price": 1}),
+    ("/products/bulk-delete", {"filter": {"price_min": 0}}),
+])
+def test_bulk_endpoints_need_a_login(brand, path, body):
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.post(path, json=body)).status_code
+
+    assert asyncio.run(post()) == 401
+    assert prices(brand) == [10] * PRODUCTS
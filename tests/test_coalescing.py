@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select
+
+import async_crud
+import async_db
+import cache
+import coalescing
+import crud
+import db
+import models
+from benchmarks.common import QueryCounter
+
+CALLERS = 50
+
+
+def test_async_callers_share_one_query(engine, product):
+    flight = coalescing.AsyncSingleFlight()
+
+    async def load(session):
+        found = await session.scalar(select(models.Product.id).where(models.Product.id == product))
+        await asyncio.sleep(0.05)  # still in flight when the other callers arrive
+        return found
+
+    async def burst():
+        # Warm the pool first: opening a SQLite connection is not a query
+        await async_db.in_own_async_session(None, load)
+        with QueryCounter(async_db.async_engine.sync_engine) as counter:
+            found = await asyncio.gather(*(
+                flight.do("product", lambda: async_db.in_own_async_session(None, load)) for _ in range(CALLERS)
+            ))
+        await async_db.dispose_async_engine()
+        return found, counter
+
+    found, counter = asyncio.run(burst())
+    assert found == [product] * CALLERS
+    assert counter.statements == 1
+    assert flight.stats() == {"executions": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_sync_callers_share_one_query(engine, product):
+    flight = coalescing.SingleFlight()
+    barrier = threading.Barrier(CALLERS)
+
+    def load(session):
+        found = session.scalar(select(models.Product.id).where(models.Product.id == product))
+        time.sleep(0.2)
+        return found
+
+    def call():
+        barrier.wait()
+        return flight.do("product", lambda: db.in_own_session(None, load))
+
+    db.in_own_session(None, load)
+    with QueryCounter(engine) as counter, ThreadPoolExecutor(CALLERS) as pool:
+        found = list(pool.map(lambda _: call(), range(CALLERS)))
+    assert found == [product] * CALLERS
+    assert counter.statements == 1
+    assert flight.stats() == {"executions": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+
+
+def test_waiters_outlive_the_first_callers_session(engine, product):
+    # The first request times out and closes its session while the shared
+    # read is still running; the other callers still get the product.
+    cache.products.local.clear()
+
+    async def slow_load(session, id):
+        loaded = await async_crud.get_product(session, id=id)
+        await asyncio.sleep(0.1)
+        # Detached if the session was closed under the shared read
+        assert loaded in session
+        return cache.product_snapshot(loaded)
+
+    async def burst():
+        async def first():
+            async with async_db.AsyncSessionLocal() as session:
+                snapshot = cache.products.get(product)
+                if snapshot is None:
+                    await coalescing.reads.do(
+                        ("product", product, session.bind),
+                        lambda: async_db.in_own_async_session(session.bind, slow_load, product),
+                        timeout=0.01,
+                    )
+
+        async def waiter():
+            await asyncio.sleep(0.02)
+            async with async_db.AsyncSessionLocal() as session:
+                return await async_crud.get_product_cached(session, product)
+
+        results = await asyncio.gather(first(), waiter(), return_exceptions=True)
+        await async_db.dispose_async_engine()
+        return results
+
+    first, snapshot = asyncio.run(burst())
+    assert isinstance(first, coalescing.CoalescingTimeout)
+    assert snapshot["id"] == product
+
+
+def test_sync_get_product_cached_queries_once(engine, product):
+    cache.products.local.clear()
+    with db.SessionLocal() as session, QueryCounter(engine) as counter:
+        assert crud.get_product_cached(session, product)["id"] == product
+        assert crud.get_product_cached(session, product)["id"] == product
+    assert counter.statements == 1
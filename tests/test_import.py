@@ -0,0 +1,30 @@
+import asyncio
+import uuid
+
+import orjson
+
+import async_crud
+import async_db
+import bulk_import
+from enums import ExportFormatEnum
+
+
+def upload(*rows):
+    async def body():
+        yield b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+    async def run():
+        async with async_db.AsyncSessionLocal() as session:
+            result = await async_crud.import_products(session, bulk_import.chunks(body(), ExportFormatEnum.NDJSON))
+        await async_db.dispose_async_engine()
+        return result
+    return asyncio.run(run())
+
+
+def test_same_name_rows_of_a_chunk_count_once(engine):
+    name = f"dup-{uuid.uuid4().hex}"
+    result = upload({"name": name, "price": 1, "brand": "a"}, {"name": name, "price": 2, "brand": "b"})
+    assert (result["inserted"], result["updated"], result["duplicates"], result["failed"]) == (1, 0, 1, 0)
+
+    result = upload({"name": name, "price": 3, "brand": "c"})
+    assert (result["inserted"], result["updated"], result["duplicates"]) == (0, 1, 0)
@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+from decimal import Decimal
+
+import pytest
+
+import async_crud
+import async_db
+import crud
+import db
+import models
+import schemas
+from benchmarks.bench_orders import QUERY_BUDGET
+from benchmarks.common import QueryCounter
+from enums import PaymentMethodEnum
+
+ORDERS = 5
+ITEMS = 10
+
+
+@pytest.fixture
+def buyer(engine):
+    # A user with ORDERS orders of ITEMS lines each
+    tag = uuid.uuid4().hex
+    with db.SessionLocal() as session:
+        user = models.User(
+            username=f"buyer-{tag}", email=f"{tag}@example.com", hashed_password="x", first_name="Test", last_name="Buyer"
+        )
+        products = [models.Product(name=f"item-{tag}-{i}", price=Decimal("9.99"), brand="test") for i in range(ITEMS)]
+        session.add(user)
+        session.add_all(products)
+        session.commit()
+        data = schemas.OrderCreate(
+            user_id=user.id, product_ids=[product.id for product in products],
+            shipping_address="1 Test Street", payment_method=PaymentMethodEnum.CARD,
+        )
+        orders = [crud.set_order(session, data).id for _ in range(ORDERS)]
+        return user.id, orders
+
+
+def test_order_detail_within_budget(engine, buyer):
+    owner_id, orders = buyer
+    with db.SessionLocal() as session, QueryCounter(engine) as counter:
+        order = crud.get_order_detail(session, order_id=orders[0], owner_id=owner_id)
+    assert len(order["items"]) == ITEMS
+    assert counter.statements <= QUERY_BUDGET
+
+
+def test_user_orders_within_budget(engine, buyer):
+    owner_id, orders = buyer
+    with db.SessionLocal() as session, QueryCounter(engine) as counter:
+        page, _ = crud.get_user_orders(session, owner_id=owner_id)
+    assert sorted(order["id"] for order in page) == sorted(orders)
+    assert all(len(order["items"]) == ITEMS for order in page)
+    assert counter.statements <= QUERY_BUDGET
+
+
+def test_async_orders_within_budget(engine, buyer):
+    owner_id, orders = buyer
+
+    async def read():
+        counts = []
+        async with async_db.AsyncSessionLocal() as session:
+            with QueryCounter(async_db.async_engine.sync_engine) as counter:
+                order = await async_crud.get_order_detail(session, order_id=orders[0], owner_id=owner_id)
+            counts.append(counter.statements)
+            with QueryCounter(async_db.async_engine.sync_engine) as counter:
+                page, _ = await async_crud.get_user_orders(session, owner_id=owner_id)
+            counts.append(counter.statements)
+        await async_db.dispose_async_engine()
+        return order, page, counts
+
+    order, page, counts = asyncio.run(read())
+    assert len(order["items"]) == ITEMS
+    assert len(page) == ORDERS
+    assert all(count <= QUERY_BUDGET for count in counts)
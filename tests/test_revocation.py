@@ -0,0 +1,67 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+import async_db
+import authentication
+import revocation
+import security
+
+
+@pytest.fixture
+def revocations(engine, monkeypatch):
+    # A fresh, not yet loaded list, as in a worker that just started
+    fresh = revocation.RevocationList()
+    monkeypatch.setattr(revocation, "revocations", fresh)
+    monkeypatch.setattr(authentication, "revocations", fresh)
+    return fresh
+
+
+def token():
+    claims = {
+        "sub": "alice", "uid": str(uuid.uuid4()), "email": "alice@example.com", "first_name": "Alice", "last_name": "A",
+    }
+    return security.create_access_token(claims)
+
+
+def authenticate(value):
+    try:
+        return asyncio.run(authentication.get_current_user(value)).username
+    except HTTPException as exc:
+        return exc.status_code
+
+
+def load(session_factory):
+    async def run():
+        loaded = await revocation.refresh_once(session_factory)
+        await async_db.dispose_async_engine()
+        return loaded
+    return asyncio.run(run())
+
+
+def test_tokens_are_refused_until_the_first_load(revocations):
+    value = token()
+    assert authenticate(value) == 503
+    assert load(async_db.AsyncSessionLocal)
+    assert authenticate(value) == "alice"
+
+
+def test_tokens_stay_refused_while_the_database_is_down(revocations):
+    def unreachable():
+        raise ConnectionRefusedError("database down")
+
+    assert not load(unreachable)
+    assert authenticate(token()) == 503
+
+
+def test_revoked_token_is_refused_once_loaded(revocations):
+    value = token()
+    assert load(async_db.AsyncSessionLocal)
+    payload = jwt.decode(value, security.SECURITY_KEY, algorithms=[security.ALGORITHM])
+    now = datetime.utcnow()
+    revocations.apply(payload["jti"], None, now, now + timedelta(minutes=5))
+    assert authenticate(value) == 401
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import main
+import routing
+
+
+def sqlite_file(name: str, directory: str) -> str:
+    # Each database says which one it is
+    url = "sqlite:///" + os.path.join(directory, f"{name}.db")
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE marker (name VARCHAR)"))
+        connection.execute(text("INSERT INTO marker VALUES (:name)"), {"name": name})
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def databases():
+    directory = tempfile.mkdtemp()
+    urls = {name: sqlite_file(name, directory) for name in ("primary", "replica0", "replica1")}
+    # A replica whose file cannot be opened stands in for one that is down
+    urls["down"] = "sqlite:///" + os.path.join(directory, "missing", "down.db")
+    return urls
+
+
+@pytest.fixture
+def replicas(databases, monkeypatch):
+    def use(*names, retry_after=routing.REPLICA_RETRY_SECONDS):
+        engines = {name: create_engine(databases[name]) for name in ("primary",) + names}
+        replica_set = routing.ReplicaSet(engines["primary"], [engines[name] for name in names], retry_after)
+        monkeypatch.setattr(routing, "_replicas", replica_set)
+        return replica_set
+    return use
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/which")
+    def which(db=Depends(routing.get_read_db)):
+        return db.execute(text("SELECT name FROM marker")).scalar()
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_reads_go_round_robin_over_the_replicas(replicas, client):
+    replicas("replica0", "replica1")
+    assert [client.get("/which").json() for _ in range(4)] == ["replica0", "replica1", "replica0", "replica1"]
+
+
+def test_failed_replica_is_skipped_then_retried(replicas, client):
+    replica_set = replicas("down", "replica1", retry_after=0.2)
+    assert client.get("/which").status_code == 500  # the request on the broken replica fails
+    assert [replica["healthy"] for replica in replica_set.status()] == [False, True]
+    assert [client.get("/which").json() for _ in range(3)] == ["replica1"] * 3
+
+    time.sleep(0.25)
+    assert [replica["healthy"] for replica in replica_set.status()] == [True, True]
+    assert replica_set.choose() is replica_set.replicas[0]
+
+
+def test_reads_fall_back_to_the_primary_without_a_healthy_replica(replicas, client):
+    replicas("down")
+    assert client.get("/which").status_code == 500
+    assert client.get("/which").json() == "primary"
+
+
+def test_pinned_reads_go_to_the_primary(replicas, client):
+    replicas("replica0", "replica1")
+    client.cookies.set(routing.PRIMARY_PIN_COOKIE, str(time.time() + 60))
+    assert [client.get("/which").json() for _ in range(3)] == ["primary"] * 3
+    # An expired pin no longer applies
+    client.cookies.set(routing.PRIMARY_PIN_COOKIE, str(time.time() - 1))
+    assert client.get("/which").json() == "replica0"
+
+
+def test_writes_set_the_pin_cookie():
+    app = FastAPI()
+    app.middleware("http")(main.read_your_writes)
+
+    @app.post("/write")
+    def write():
+        return {}
+
+    @app.get("/read")
+    def read():
+        return {}
+
+    client = TestClient(app)
+    assert routing.PRIMARY_PIN_COOKIE not in client.get("/read").cookies
+    deadline = float(client.post("/write").cookies[routing.PRIMARY_PIN_COOKIE])
+    assert time.time() < deadline <= time.time() + routing.READ_YOUR_WRITES_SECONDS
+
+
+def test_async_reads_use_the_chosen_replica(databases, monkeypatch):
+    async_urls = {name: routing.to_async_url(databases[name]) for name in ("primary", "replica0")}
+    replica_set = routing.ReplicaSet(
+        create_async_engine(async_urls["primary"]), [create_async_engine(async_urls["replica0"])]
+    )
+    monkeypatch.setattr(routing, "_async_replicas", replica_set)
+    app = FastAPI()
+
+    @app.get("/which")
+    async def which(db: AsyncSession = Depends(routing.get_async_read_db)):
+        return (await db.execute(text("SELECT name FROM marker"))).scalar()
+
+    client = TestClient(app)
+    assert client.get("/which").json() == "replica0"
+    client.cookies.set(routing.PRIMARY_PIN_COOKIE, str(time.time() + 60))
+    assert client.get("/which").json() == "primary"
@@ -0,0 +1,27 @@
+import asyncio
+
+import httpx
+
+import main
+import slow_queries
+
+
+def test_failed_plan_records_no_bound_values(engine):
+    entry = {}
+    slow_queries._explain_slot.acquire()  # as _should_explain does
+    slow_queries._explain_sync(
+        engine, "sqlite", entry, "EXPLAIN QUERY PLAN SELECT * FROM missing WHERE email = ?", ("alice@example.com",)
+    )
+    assert entry["plan_error"] == "OperationalError"
+    assert "alice" not in str(slow_queries.recent[-1])
+
+
+def test_slow_query_log_needs_the_internal_token():
+    async def get(headers):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return (await client.get("/internal/db/slow-queries", headers=headers)).status_code
+
+    assert asyncio.run(get({})) == 403
+    assert asyncio.run(get({"X-Internal-Token": "wrong"})) == 403
+    assert asyncio.run(get({"X-Internal-Token": "test-internal-token"})) == 200